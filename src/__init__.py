@@ -1,3 +1,12 @@
 from .logger import logger
-from .session import Session
 from .tileset import Tileset
+
+
+def __getattr__(name: str):
+    # The session requires Blender, so it's only imported when used, see utils.blender
+    if name == 'Session':
+        from .session import Session
+
+        return Session
+
+    raise AttributeError(f'module {__name__!r} has no attribute {name!r}')
@@ -5,7 +5,7 @@ from bpy.types import Object
 from mathutils import Vector
 from pydantic import BaseModel, PrivateAttr
 
-from src import Tileset, logger, utils
+from src import Tileset, enums, logger, utils
 
 
 class Chunk(BaseModel):
@@ -48,15 +48,20 @@ class Chunk(BaseModel):
 
         return cls(object, grid_x, grid_y)
 
-    def clean(self):
-        utils.object.clean()
+    def clean(self, merge_distance: float = 0.0001):
+        cleaned_mesh = utils.object.clean(self._object, merge_distance)
+
+        logger.debug(
+            f'Successfully cleaned chunk {self.grid_x}_{self.grid_y}: removed {cleaned_mesh.removed_vertex_count} vertices, '
+            f'{cleaned_mesh.removed_degenerate_face_count} degenerate faces and {cleaned_mesh.removed_duplicate_face_count} duplicate faces'
+        )
 
     def combine_materials(self):
         if len(self._object.data.materials) > 1:
             utils.object.combine_materials(self._object)
 
-    def create_tileset(self, max_depth: int) -> Tileset:
-        return Tileset.create(self._object, max_depth)
+    def create_tileset(self, max_depth: int, refine: enums.Refine = enums.Refine.replace, bounding_volume_type: enums.BoundingVolume = enums.BoundingVolume.box) -> Tileset:
+        return Tileset.create(self._object, max_depth, refine, bounding_volume_type)
 
-    def get_tileset(self, max_depth: int) -> Tileset:
-        return Tileset.get(self.grid_x, self.grid_y, max_depth)
+    def get_tileset(self, max_depth: int, bounding_volume_type: enums.BoundingVolume = enums.BoundingVolume.box) -> Tileset:
+        return Tileset.get(self.grid_x, self.grid_y, max_depth, bounding_volume_type)
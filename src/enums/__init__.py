@@ -1 +1,2 @@
+from .bounding_volume import BoundingVolume
 from .refine import Refine
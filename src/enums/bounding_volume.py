@@ -0,0 +1,6 @@
+from enum import Enum
+
+
+class BoundingVolume(Enum):
+    box = 'box'
+    sphere = 'sphere'
@@ -47,6 +47,7 @@ setup_blender_local_dev_environment()
 reload_modules()
 
 from src.chunk import Chunk  # noqa
+from src.pyramid import Pyramid  # noqa
 from src.session import Session  # noqa
 
 # Initialize session, which automatically cleans up existing data in the scene
@@ -60,9 +61,19 @@ chunk = Chunk.create(grid_x, grid_y, file_path=f'data/input/Tile-{grid_x}-{grid_
 chunk.clean()
 chunk.combine_materials()
 
+# Oversized inputs can be split into quadrants first, which are then created as separate chunks
+# from src.utils import obj
+# file_paths = obj.split(f'data/input/Tile-{grid_x}-{grid_y}-1-1.obj', folder_path='data/input/split', depth=1)
+
 # chunk = Chunk.load(grid_x, grid_y)
 # tileset = chunk.create_tileset(max_depth=4)
 
 # chunk = Chunk.load(grid_x, grid_y)
 # tileset = chunk.get_tileset(max_depth=4)
 # tileset.save(folder_path='/Users/jonas.frei/Documents/JavaScript/playground_frontend/public/output/')
+# Without Draco the contents are larger, but sorted spatially and don't need to be decoded by the viewer
+# tileset.save(folder_path='/Users/jonas.frei/Documents/JavaScript/playground_frontend/public/output/', draco_compression=False)
+
+# Chunks record their center, the pyramid moves all of them to the center of the first chunk
+# pyramid = Pyramid(folder_path='data/output', grid_coordinates=[(106, 69), (107, 69), (106, 70), (107, 70)])
+# tileset = pyramid.save()
@@ -0,0 +1,158 @@
+from typing import Optional
+
+import bpy
+from bpy.types import Object
+
+from src import enums, logger, utils
+from src.tileset import ROOT_TRANSFORM, Tileset, bounding_volume
+from src.tileset.content import Content
+from src.tileset.tile import Tile
+
+
+class Pyramid:
+    """
+    Builds coarser tiles above the chunk grid by repeatedly merging 2x2 neighbouring tiles, up to a single root tile.
+    Each merged tile is simplified and its texture downscaled, so it has about the same size as each of its children.
+    Chunks that were recentred on a different center than the pyramid (see Chunk.create) are moved to it by a translation of their root tile.
+    """
+
+    def __init__(
+        self,
+        folder_path: str,
+        grid_coordinates: list[tuple[int, int]],
+        chunk_folder_name: str = 'chunk_{grid_x}_{grid_y}',
+        bounding_volume_type: enums.BoundingVolume = enums.BoundingVolume.box,
+        center: Optional[list[float]] = None,
+    ):
+        self.folder_path = folder_path
+        self.grid_coordinates = grid_coordinates
+        self.chunk_folder_name = chunk_folder_name
+        self.bounding_volume_type = bounding_volume_type
+        # Defaults to the center of the first chunk
+        self.center = center
+
+    def load_chunk_tile(self, grid_x: int, grid_y: int) -> Tile:
+        """
+        Loads the root tile of a saved chunk tileset, with its content paths relative to the pyramid folder and its transform relative to the pyramid center.
+        """
+
+        chunk_folder_name = self.chunk_folder_name.format(grid_x=grid_x, grid_y=grid_y)
+        tileset = Tileset.load(f'{self.folder_path}/{chunk_folder_name}')
+        tile = tileset.root
+        if tile.content is None or tile.content.uri is None:
+            raise Exception(f'Root tile of chunk {grid_x}_{grid_y} should have content to be merged into the pyramid')
+        if tileset.extras is None:
+            raise Exception(f'Tileset of chunk {grid_x}_{grid_y} does not record its center and can not be placed in the pyramid')
+
+        if self.center is None:
+            self.center = tileset.extras.center
+
+        # The pyramid root already applies the rotation of the root transform, so only the offset between the centers remains
+        offset = [chunk_value - value for chunk_value, value in zip(tileset.extras.center, self.center)]
+        tile.transform = [1, 0, 0, 0, 0, 1, 0, 0, 0, 0, 1, 0, *offset, 1] if any(offset) else None
+        prefix_content_uris(tile, prefix=f'{chunk_folder_name}/')
+
+        return tile
+
+    def import_content(self, tile: Tile) -> Object:
+        bpy.ops.object.select_all(action='DESELECT')
+        bpy.ops.import_scene.gltf(filepath=f'{self.folder_path}/{tile.content.uri}')
+        object = bpy.context.selected_objects[0]
+
+        # Chunk contents are stored relative to their own center
+        if tile.transform:
+            object.location = tile.transform[12:15]
+
+        return object
+
+    def merge_tiles(self, tiles: list[Tile], object_name: str) -> Tile:
+        """
+        Creates a parent tile by merging the contents of the given tiles, simplifying the geometry and downscaling the texture.
+        """
+
+        objects = [self.import_content(tile) for tile in tiles]
+
+        # Join the imported contents into a single object
+        bpy.ops.object.select_all(action='DESELECT')
+        for object in objects:
+            object.select_set(True)
+        bpy.context.view_layer.objects.active = objects[0]
+        bpy.ops.object.join()
+        object = bpy.context.view_layer.objects.active
+        object.name = object_name
+        # Move the vertices into the pyramid coordinates, as the joined object keeps the location of the first content
+        bpy.ops.object.transform_apply(location=True, rotation=True, scale=True)
+
+        if len(object.data.materials) > 1:
+            utils.object.combine_materials(object)
+            object = bpy.data.objects[object_name]
+        object.data.materials[0].name = object_name
+
+        geometry_stats = utils.geometry.GeometryStats.from_object(object)
+        # The merged content is simplified by the same factor as the area grows, so it has to be less accurate than each of its children
+        geometric_error = max(utils.tile.calculate_geometric_error(geometry_stats), 2 * max(tile.geometric_error for tile in tiles))
+
+        tile = Tile(
+            bounding_volume=bounding_volume.create(geometry_stats, self.bounding_volume_type),
+            geometric_error=geometric_error,
+            refine=enums.Refine.replace,
+            content=Content(object),
+            children=tiles,
+        )
+
+        # Halve the texture resolution and keep a quarter of the geometry, as the tile covers the area of four children
+        utils.material.change_texture_resolution(object.data.materials[0], texture_scale=0.5, new_image_name=f'{object_name}__low_resolution')
+        tile.content.simplify(0.25)
+        tile.content.save(self.folder_path)
+
+        # Remove the merged object and its data, as the next level imports the saved content again
+        bpy.data.objects.remove(object, do_unlink=True)
+        bpy.ops.outliner.orphans_purge(do_recursive=True)
+
+        logger.debug(f'Successfully created the pyramid tile {object_name}')
+
+        return tile
+
+    def create(self) -> Tileset:
+        """
+        Merges the chunk root tiles level by level and returns the tileset of the whole pyramid, including all chunk tiles.
+        """
+
+        min_grid_x = min(grid_x for grid_x, _ in self.grid_coordinates)
+        min_grid_y = min(grid_y for _, grid_y in self.grid_coordinates)
+
+        # Tiles of the current level, keyed by their position relative to the lower left chunk
+        tiles = {(grid_x - min_grid_x, grid_y - min_grid_y): self.load_chunk_tile(grid_x, grid_y) for grid_x, grid_y in self.grid_coordinates}
+
+        level = 1
+        while len(tiles) > 1:
+            # Group the tiles into the 2x2 blocks of the next level
+            groups: dict[tuple[int, int], list[Tile]] = {}
+            for (x, y), tile in sorted(tiles.items()):
+                groups.setdefault((x // 2, y // 2), []).append(tile)
+
+            tiles = {(x, y): self.merge_tiles(group, object_name=f'pyramid_{level}_{x}_{y}') for (x, y), group in groups.items()}
+            level += 1
+
+        root = next(iter(tiles.values()))
+        root.transform = ROOT_TRANSFORM
+
+        return Tileset.from_root(root, center=self.center)
+
+    def save(self) -> Tileset:
+        """
+        Creates the pyramid and saves its tileset JSON, as all contents are already saved while merging.
+        """
+
+        tileset = self.create()
+        tileset.save_json(self.folder_path)
+
+        return tileset
+
+
+def prefix_content_uris(tile: Tile, prefix: str):
+    if tile.content and tile.content.uri:
+        tile.content.uri = prefix + tile.content.uri
+
+    for child in tile.children or []:
+        prefix_content_uris(child, prefix)
@@ -0,0 +1,2 @@
+from .camera import Camera, CameraPath
+from .simulator import FrameStatistics, PathStatistics, Simulator
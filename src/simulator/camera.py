@@ -0,0 +1,77 @@
+import math
+
+from src.utils.pydantic import BaseSchema
+
+Vector3 = tuple[float, float, float]
+
+
+class Camera(BaseSchema):
+    position: Vector3
+    target: Vector3
+    field_of_view: float = math.radians(60)  # vertical field of view in radians
+    screen_height: int = 1080  # screen height in pixels
+
+    def get_direction(self) -> Vector3:
+        direction = [self.target[i] - self.position[i] for i in range(3)]
+        length = math.sqrt(sum(value**2 for value in direction))
+        if length == 0:
+            raise Exception('Camera position and target should not be identical')
+
+        return (direction[0] / length, direction[1] / length, direction[2] / length)
+
+    def get_distance(self, center: Vector3, radius: float) -> float:
+        """
+        Calculates the distance from the camera to the surface of a bounding sphere.
+        """
+
+        distance_to_center = math.sqrt(sum((center[i] - self.position[i]) ** 2 for i in range(3)))
+
+        # Avoid a division by zero when the camera is inside the bounding sphere
+        return max(distance_to_center - radius, 1e-6)
+
+    def is_visible(self, center: Vector3, radius: float) -> bool:
+        """
+        Checks whether a bounding sphere intersects the view cone of the camera.
+        """
+
+        offset = [center[i] - self.position[i] for i in range(3)]
+        distance_to_center = math.sqrt(sum(value**2 for value in offset))
+        if distance_to_center <= radius:
+            return True
+
+        # Compare the angle between view direction and sphere center with the half field of view, widened by the sphere's angular radius
+        direction = self.get_direction()
+        cos_angle = sum(offset[i] * direction[i] for i in range(3)) / distance_to_center
+        angle = math.acos(max(-1, min(1, cos_angle)))
+        angular_radius = math.asin(min(radius / distance_to_center, 1))
+
+        return angle <= self.field_of_view / 2 + angular_radius
+
+    def calculate_screen_space_error(self, geometric_error: float, distance: float) -> float:
+        """
+        Projects a geometric error in meters onto the screen in pixels, as done by 3D Tiles viewers.
+        """
+
+        return geometric_error * self.screen_height / (2 * distance * math.tan(self.field_of_view / 2))
+
+
+class CameraPath(BaseSchema):
+    name: str
+    frames: list[Camera]
+
+    @classmethod
+    def interpolate(cls, name: str, start: Vector3, end: Vector3, target: Vector3, frame_count: int) -> 'CameraPath':
+        """
+        Creates a path moving the camera linearly from start to end while looking at the target.
+        """
+
+        if frame_count < 2:
+            raise Exception('Camera path should contain at least two frames')
+
+        frames = []
+        for frame_index in range(frame_count):
+            t = frame_index / (frame_count - 1)
+            position = (start[0] + (end[0] - start[0]) * t, start[1] + (end[1] - start[1]) * t, start[2] + (end[2] - start[2]) * t)
+            frames.append(Camera(position=position, target=target))
+
+        return cls(name=name, frames=frames)
@@ -0,0 +1,167 @@
+import math
+import os
+from typing import Optional
+
+from src import Tileset, enums, logger
+from src.tileset import bounding_volume
+from src.tileset.content import ContentStatistics
+from src.tileset.tile import Tile
+from src.utils.pydantic import BaseSchema
+
+from .camera import Camera, CameraPath, Vector3
+
+IDENTITY_MATRIX = [1, 0, 0, 0, 0, 1, 0, 0, 0, 0, 1, 0, 0, 0, 0, 1]
+
+
+def multiply_matrices(matrix_a: list[float], matrix_b: list[float]) -> list[float]:
+    """
+    Multiplies two column-major 4x4 matrices, as used by the 3D Tiles transform property.
+    """
+
+    return [sum(matrix_a[k * 4 + row] * matrix_b[column * 4 + k] for k in range(4)) for column in range(4) for row in range(4)]
+
+
+def transform_box(matrix: list[float], box: list[float]) -> tuple[Vector3, float]:
+    """
+    Transforms an oriented bounding box and returns the center and radius of its bounding sphere.
+    """
+
+    center = tuple(sum(matrix[column * 4 + row] * box[column] for column in range(3)) + matrix[12 + row] for row in range(3))
+
+    # The radius of the sphere enclosing the box is the length of the sum of its half axes
+    radius_squared = 0
+    for axis_index in range(3):
+        axis = box[3 + axis_index * 3 : 6 + axis_index * 3]
+        transformed_axis = [sum(matrix[column * 4 + row] * axis[column] for column in range(3)) for row in range(3)]
+        radius_squared += sum(value**2 for value in transformed_axis)
+
+    return (center, math.sqrt(radius_squared))
+
+
+def transform_sphere(matrix: list[float], sphere: list[float]) -> tuple[Vector3, float]:
+    """
+    Transforms a bounding sphere, scaling its radius by the largest scale of the transform.
+    """
+
+    center = tuple(sum(matrix[column * 4 + row] * sphere[column] for column in range(3)) + matrix[12 + row] for row in range(3))
+    scale = max(math.sqrt(sum(matrix[column * 4 + row] ** 2 for row in range(3))) for column in range(3))
+
+    return (center, sphere[3] * scale)
+
+
+class SimulatedTile:
+    """
+    A tile of a loaded tileset, with its bounding volume resolved to tileset coordinates.
+    """
+
+    def __init__(self, tile: Tile, parent_transform: list[float], parent_refine: enums.Refine):
+        transform = multiply_matrices(parent_transform, tile.transform or IDENTITY_MATRIX)
+        if isinstance(tile.bounding_volume, bounding_volume.Sphere):
+            (self.center, self.radius) = transform_sphere(transform, tile.bounding_volume.sphere)
+        else:
+            (self.center, self.radius) = transform_box(transform, tile.bounding_volume.box)
+        self.geometric_error = tile.geometric_error
+        # Refinement is inherited from the parent tile if not specified
+        self.refine = tile.refine if 'refine' in tile.model_fields_set else parent_refine
+
+        self.uri: Optional[str] = None
+        self.statistics: Optional[ContentStatistics] = None
+        if tile.content and tile.content.uri:
+            self.uri = tile.content.uri
+            self.statistics = tile.content.statistics
+
+        self.children = [SimulatedTile(child, transform, self.refine) for child in tile.children or []]
+
+
+class FrameStatistics(BaseSchema):
+    bytes_fetched: int
+    tiles_requested: int
+    tiles_rendered: int
+    triangles_rendered: int
+
+
+class PathStatistics(BaseSchema):
+    name: str
+    frames: list[FrameStatistics]
+    total_bytes_fetched: int
+    total_tiles_requested: int
+    max_triangles_rendered: int
+
+
+class Simulator:
+    """
+    Replays camera paths over a saved tileset using screen space error traversal, to benchmark the streaming cost for viewers.
+    """
+
+    def __init__(self, root: SimulatedTile, tileset_byte_length: int, maximum_screen_space_error: float = 16):
+        self.root = root
+        self.tileset_byte_length = tileset_byte_length
+        self.maximum_screen_space_error = maximum_screen_space_error
+
+    @classmethod
+    def load(cls, folder_path: str, maximum_screen_space_error: float = 16) -> 'Simulator':
+        tileset = Tileset.load(folder_path)
+        root = SimulatedTile(tileset.root, IDENTITY_MATRIX, enums.Refine.replace)
+
+        return cls(root, tileset_byte_length=os.path.getsize(f'{folder_path}/tileset.json'), maximum_screen_space_error=maximum_screen_space_error)
+
+    def select_tiles(self, tile: SimulatedTile, camera: Camera, selected_tiles: list[SimulatedTile]):
+        """
+        Recursively selects the tiles to render from the camera, following the refinement strategy of each tile.
+        """
+
+        if not camera.is_visible(tile.center, tile.radius):
+            return
+
+        distance = camera.get_distance(tile.center, tile.radius)
+        screen_space_error = camera.calculate_screen_space_error(tile.geometric_error, distance)
+        refine = screen_space_error > self.maximum_screen_space_error and len(tile.children) > 0
+
+        # Replaced tiles are only rendered if they aren't refined, added tiles are always rendered alongside their children
+        if tile.uri and (not refine or tile.refine == enums.Refine.add):
+            selected_tiles.append(tile)
+
+        if refine:
+            for child in tile.children:
+                self.select_tiles(child, camera, selected_tiles)
+
+    def run(self, camera_path: CameraPath) -> PathStatistics:
+        """
+        Replays a camera path, assuming an unbounded cache so every content is fetched at most once.
+        """
+
+        fetched_uris: set[str] = set()
+        frames: list[FrameStatistics] = []
+
+        for frame_index, camera in enumerate(camera_path.frames):
+            selected_tiles: list[SimulatedTile] = []
+            self.select_tiles(self.root, camera, selected_tiles)
+
+            new_tiles = [tile for tile in selected_tiles if tile.uri not in fetched_uris]
+            fetched_uris.update(tile.uri for tile in new_tiles)
+
+            # The tileset JSON itself is fetched with the first frame
+            bytes_fetched = sum(tile.statistics.byte_length for tile in new_tiles)
+            if frame_index == 0:
+                bytes_fetched += self.tileset_byte_length
+
+            frames.append(
+                FrameStatistics(
+                    bytes_fetched=bytes_fetched,
+                    tiles_requested=len(new_tiles),
+                    tiles_rendered=len(selected_tiles),
+                    triangles_rendered=sum(tile.statistics.triangle_count for tile in selected_tiles),
+                )
+            )
+
+        path_statistics = PathStatistics(
+            name=camera_path.name,
+            frames=frames,
+            total_bytes_fetched=sum(frame.bytes_fetched for frame in frames),
+            total_tiles_requested=sum(frame.tiles_requested for frame in frames),
+            max_triangles_rendered=max((frame.triangles_rendered for frame in frames), default=0),
+        )
+
+        logger.debug(f'Simulated camera path {camera_path.name}: {path_statistics.total_bytes_fetched} bytes in {path_statistics.total_tiles_requested} requests')
+
+        return path_statistics
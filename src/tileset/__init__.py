@@ -1 +1 @@
-from .tileset import Tileset
+from .tileset import ROOT_TRANSFORM, Tileset
@@ -1 +1,15 @@
+from typing import Union
+
+from src import enums
+from src.utils.geometry import GeometryStats
+
 from .box import Box
+from .sphere import Sphere
+
+
+# Bounding volumes are only calculated from geometry stats here, when they are constructed without them they are validated from the given data instead
+def create(geometry_stats: GeometryStats, bounding_volume_type: enums.BoundingVolume) -> Union[Box, Sphere]:
+    if bounding_volume_type == enums.BoundingVolume.sphere:
+        return Sphere(geometry_stats)
+
+    return Box(geometry_stats)
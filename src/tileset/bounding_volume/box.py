@@ -1,18 +1,22 @@
-from bpy.types import Object
+import math
+from typing import Optional
 
-from src import utils
+from src.utils.geometry import GeometryStats
 from src.utils.pydantic import BaseSchema
 
 
 class Box(BaseSchema):
     box: list[float]
 
-    def __init__(self, object: Object):
-        box = self.calculate_box(object)
-        super().__init__(box=box)
+    def __init__(self, geometry_stats: Optional[GeometryStats] = None, **data):
+        if geometry_stats is not None:
+            data['box'] = self.calculate_box(geometry_stats)
+        super().__init__(**data)
 
-    def calculate_box(self, object: Object) -> list[float]:
-        (center_x, center_y, center_z) = utils.object.get_bounding_box_center(object)
-        (length_x, length_y, length_z) = utils.object.get_axis_lengths(object)
+    def calculate_box(self, geometry_stats: GeometryStats) -> list[float]:
+        # Center followed by the x, y and z half axes of the oriented box
+        return [float(value) for value in [*geometry_stats.box_center, *geometry_stats.box_half_axes.ravel()]]
 
-        return [center_x, center_y, center_z, length_x / 2, 0, 0, 0, length_y / 2, 0, 0, 0, length_z / 2]
+    def get_radius(self) -> float:
+        # Half of the box diagonal, as the half axes are orthogonal
+        return math.sqrt(sum(value**2 for value in self.box[3:]))
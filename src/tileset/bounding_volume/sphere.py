@@ -0,0 +1,20 @@
+from typing import Optional
+
+from src.utils.geometry import GeometryStats
+from src.utils.pydantic import BaseSchema
+
+
+class Sphere(BaseSchema):
+    sphere: list[float]
+
+    def __init__(self, geometry_stats: Optional[GeometryStats] = None, **data):
+        if geometry_stats is not None:
+            data['sphere'] = self.calculate_sphere(geometry_stats)
+        super().__init__(**data)
+
+    def calculate_sphere(self, geometry_stats: GeometryStats) -> list[float]:
+        # Center followed by the radius
+        return [float(value) for value in [*geometry_stats.sphere_center, geometry_stats.sphere_radius]]
+
+    def get_radius(self) -> float:
+        return self.sphere[3]
@@ -1,26 +1,53 @@
+import os
 import uuid
 from typing import Optional
 
-import bpy
-from bpy.types import Object
-from pydantic import PrivateAttr
+from pydantic import Field, PrivateAttr
 
 from src import utils
+from src.utils.blender import Object, bpy
 from src.utils.pydantic import BaseSchema
 
 
+class ContentStatistics(BaseSchema):
+    byte_length: int
+    triangle_count: int
+    texture_sizes: list[tuple[int, int]]
+
+
 class Content(BaseSchema):
     uri: Optional[str]
+    # Only available for loaded tilesets and not part of the tileset JSON
+    statistics: Optional[ContentStatistics] = Field(default=None, exclude=True)
 
     _object: Object = PrivateAttr()
-
-    def __init__(self, object: Object):
-        super().__init__(uri=None)
+    # Memory-mapped copy of the texture, which replaces the Blender image while the children of the tile are created
+    _texture: Optional['utils.tiled_image.TiledImage'] = PrivateAttr(default=None)
+
+    def __init__(self, object: Optional[Object] = None, **data):
+        # Without an object, the content is validated from the given data, e.g. when loading a saved tileset
+        if object is not None:
+            data['uri'] = None
+        super().__init__(**data)
         self._object = object
 
     def get_object(self) -> Object:
         return self._object
 
+    def load_statistics(self, folder_path: str):
+        """
+        Reads the size, triangle count and texture dimensions of the saved tile from its GLB headers.
+        """
+
+        file_path = os.path.join(folder_path, self.uri)
+        gltf = utils.glb.read_json_chunk(file_path)
+
+        self.statistics = ContentStatistics(
+            byte_length=os.path.getsize(file_path),
+            triangle_count=utils.glb.count_triangles(gltf),
+            texture_sizes=utils.glb.read_image_sizes(file_path, gltf),
+        )
+
     def subdivide(self) -> list[Object]:
         """
         Subdivides the tile into smaller child tiles.
@@ -29,6 +56,13 @@ class Content(BaseSchema):
         utils.object.subdivide(self._object)
 
         children_objects = [object for object in bpy.context.selectable_objects if object.name.startswith(self._object.name) and object.name != self._object.name]
+
+        # Move the texture to a memory-mapped file, so it isn't held in memory while the children are created
+        image_node = utils.object.get_image_nodes(self._object)[0]
+        image = image_node.image
+        self._texture = utils.tiled_image.TiledImage.from_image(image)
+        image_node.image = None
+
         for index, child_object in enumerate(children_objects):
             child_object.name = f'{self._object.name}_{index}'
 
@@ -37,8 +71,41 @@ class Content(BaseSchema):
             child_object.data.materials.clear()
             child_object.data.materials.append(material)
 
+            # Each child bakes its texture from its own crop, instead of the full texture of this tile
+            utils.image.crop_to_uv_bounds(utils.object.get_image_nodes(child_object)[0], child_object, self._texture, new_image_name=f'{child_object.name}__source')
+
+        if image.users == 0:
+            bpy.data.images.remove(image)
+
         return children_objects
 
+    def load_texture(self):
+        """
+        Restores the texture moved to a memory-mapped file when subdividing the tile.
+        """
+
+        if self._texture is None:
+            return
+
+        image_node = utils.object.get_image_nodes(self._object)[0]
+        image_node.image = self._texture.to_image(f'{self._object.name}__source')
+        self._texture.remove()
+        self._texture = None
+
+    def remove(self):
+        """
+        Removes the tile's object and the memory-mapped copy of its texture.
+        """
+
+        if self._texture is not None:
+            self._texture.remove()
+            self._texture = None
+
+        bpy.data.objects.remove(self._object, do_unlink=True)
+
+    def is_empty(self) -> bool:
+        return len(self._object.data.polygons) == 0
+
     def simplify(self, ratio: float):
         """
         Simplifies the tile's geometry.
@@ -54,17 +121,43 @@ class Content(BaseSchema):
         if len(self._object.data.materials) != 1:
             raise Exception('Tile object should only contain one material')
 
+        self.load_texture()
         material = self._object.data.materials[0]
         self._object.data.materials[0] = utils.material.change_texture_resolution(material, texture_scale, new_image_name=f'{self._object.name}__low_resolution')
 
-    def remove_unused_texture_pixels(self):
+    def remove_unused_texture_pixels(self, texture_scale: float = 1):
+        """
+        Crops the tile's texture to its UV-mapped area and bakes it at the specified scale.
+        """
+
+        self.load_texture()
         images_nodes = utils.object.get_image_nodes(self._object)
         image_node = images_nodes[0]
+        image = image_node.image
         material = self._object.data.materials[0]
 
-        utils.image.remove_unused_pixels(image_node, material, self._object, new_uv_layer_name=str(uuid.uuid4()))
+        utils.image.remove_unused_pixels(image_node, material, self._object, new_uv_layer_name=str(uuid.uuid4()), texture_scale=texture_scale)
+
+        # Free the source image, unless it's still used by another tile
+        if image.users == 0:
+            bpy.data.images.remove(image)
+
+    def optimize(self, sort_spatially: bool = True, keep_normals: bool = True):
+        """
+        Prepares the tile's mesh for export by applying modifiers, removing unused data and optionally sorting it spatially.
+        """
+
+        utils.object.apply_modifiers(self._object)
+        utils.object.remove_unused_attributes(self._object, keep_normals)
+        utils.object.merge_vertices(self._object)
+        if sort_spatially:
+            utils.object.sort_spatially(self._object)
+
+    def save(self, folder_path: str, export_normals: bool = True, draco_compression: bool = True):
+        """
+        Exports the tile as GLB. Normals can be omitted for unlit content like photogrammetry, which viewers shade flat.
+        """
 
-    def save(self, folder_path: str):
         utils.object.remove_inactive_uv_layers(self._object)
         self._object.data.uv_layers.active.name = 'UVMap'
 
@@ -75,6 +168,9 @@ class Content(BaseSchema):
         self._object.select_set(True)
         bpy.context.view_layer.objects.active = self._object
 
+        # Draco reorders faces and vertices itself when encoding, so the spatial order only reaches uncompressed files
+        self.optimize(sort_spatially=not draco_compression, keep_normals=export_normals)
+
         self.uri = f'{self._object.name}.glb'
 
         bpy.ops.export_scene.gltf(
@@ -83,6 +179,7 @@ class Content(BaseSchema):
             export_format='GLB',
             export_apply=True,
             export_materials='EXPORT',
+            export_normals=export_normals,
             export_image_format='WEBP',
-            export_draco_mesh_compression_enable=True,
+            export_draco_mesh_compression_enable=draco_compression,
         )
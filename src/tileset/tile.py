@@ -1,10 +1,11 @@
+import math
 import re
-from typing import Optional
+from typing import Optional, Union
 
-import bpy
-from bpy.types import Object
+from pydantic import model_serializer
 
 from src import enums, logger, utils
+from src.utils.blender import Object, bpy
 from src.utils.pydantic import BaseSchema
 
 from . import bounding_volume
@@ -12,53 +13,117 @@ from .content import Content
 
 
 class Tile(BaseSchema):
-    transform: Optional[list[float]]
-    bounding_volume: bounding_volume.Box
+    transform: Optional[list[float]] = None
+    bounding_volume: Union[bounding_volume.Box, bounding_volume.Sphere]
     geometric_error: float
     refine: enums.Refine = enums.Refine.replace
-    content: Content
-    children: list['Tile']
+    content: Optional[Content] = None
+    children: Optional[list['Tile']] = None
+
+    @model_serializer(mode='wrap')
+    def serialize(self, handler) -> dict:
+        data = handler(self)
+        # Tiles without a refinement inherit it from their parent, so it's only written if it was set, to keep loaded ADD children from being saved as REPLACE
+        if 'refine' not in self.model_fields_set:
+            data.pop('refine', None)
+        return data
 
     @classmethod
-    def get(cls, object: Object, current_depth: int, max_depth: int) -> 'Tile':
+    def get(cls, object: Object, current_depth: int, max_depth: int, bounding_volume_type: enums.BoundingVolume = enums.BoundingVolume.box) -> 'Tile':
         # transformation_matrix = utils.tile.calculate_transformation_matrix(object)
-        geometric_error = utils.tile.calculate_geometric_error(object)
-        tile = cls(transform=None, bounding_volume=bounding_volume.Box(object), geometric_error=geometric_error, content=Content(object), children=[])
-        tile.children = tile.get_children(current_depth, max_depth, parent_object_name=object.name)
+        geometry_stats = utils.geometry.GeometryStats.from_object(object)
+        geometric_error = utils.tile.calculate_geometric_error(geometry_stats)
+        tile = cls(
+            transform=None,
+            bounding_volume=bounding_volume.create(geometry_stats, bounding_volume_type),
+            geometric_error=geometric_error,
+            refine=enums.Refine.replace,
+            content=Content(object),
+            children=[],
+        )
+        tile.children = tile.get_children(current_depth, max_depth, parent_object_name=object.name, bounding_volume_type=bounding_volume_type)
         return tile
 
     @classmethod
-    def create(cls, object: Object, current_depth: int, max_depth: int) -> 'Tile':
+    def create(
+        cls,
+        object: Object,
+        current_depth: int,
+        max_depth: int,
+        refine: enums.Refine = enums.Refine.replace,
+        bounding_volume_type: enums.BoundingVolume = enums.BoundingVolume.box,
+    ) -> 'Tile':
         # transformation_matrix = utils.tile.calculate_transformation_matrix(object)
-        geometric_error = utils.tile.calculate_geometric_error(object)
-        tile = cls(transform=None, bounding_volume=bounding_volume.Box(object), geometric_error=geometric_error, content=Content(object), children=[])
-
-        if current_depth != 1:
-            tile.content.remove_unused_texture_pixels()
+        # The bounding volume and geometric error are calculated once before subdividing, so they also cover the content of added children
+        geometry_stats = utils.geometry.GeometryStats.from_object(object)
+        geometric_error = utils.tile.calculate_geometric_error(geometry_stats)
+        tile = cls(
+            transform=None,
+            bounding_volume=bounding_volume.create(geometry_stats, bounding_volume_type),
+            geometric_error=geometric_error,
+            refine=refine,
+            content=Content(object),
+            children=[],
+        )
+        object_name = object.name
+
+        if refine == enums.Refine.add and current_depth < max_depth:
+            min_region_area = utils.tile.calculate_coarse_region_area(geometry_stats)
+            # Rendering this tile without its children misses all faces outside of the regions it keeps
+            tile.geometric_error = max(geometric_error, math.sqrt(min_region_area))
+
+            # Large planar regions are dissolved into few faces and kept in this tile, so the children only refine the remaining faces
+            coarse_object = utils.object.separate_planar_regions(object, min_area=min_region_area, new_object_name=f'{object_name}__coarse')
+            tile.children = tile.create_children(current_depth, max_depth, refine, bounding_volume_type) if not tile.content.is_empty() else None
+
+            if coarse_object is None:
+                logger.warning(f'Tile {object_name} has no planar regions with an area of at least {min_region_area:.1f}, so its faces are only rendered by its children')
+                tile.content.remove()
+                tile.content = None
+            else:
+                # The coarse object shares the material, so the texture is restored before the remaining object is removed
+                tile.content.load_texture()
+                tile.content.remove()
+                bpy.context.collection.objects.link(coarse_object)
+                coarse_object.name = object_name
+                tile.content = Content(coarse_object)
+                tile.content.remove_unused_texture_pixels()
+        else:
+            # Create children first, so they bake their textures from the full resolution image of this tile
+            tile.children = tile.create_children(current_depth, max_depth, refine, bounding_volume_type)
+
+            # Reduce texture resolution based on the tileset depth
+            texture_scale = 1 / 2 ** (max_depth - current_depth)
+            if current_depth != 1:
+                # Crop the texture and bake it directly at the target resolution
+                tile.content.remove_unused_texture_pixels(texture_scale)
+            elif current_depth < max_depth:
+                # The root texture is already fully used, so it only needs to be downscaled
+                tile.content.reduce_texture_resolution(texture_scale)
 
-        tile.children = tile.create_children(current_depth, max_depth)
+            if current_depth < max_depth:
+                # Simplify geometry based on the tileset depth
+                simplification_ratio = 1 / 4 ** (max_depth - current_depth)
+                tile.content.simplify(simplification_ratio if simplification_ratio > 0.03 else 0.03)
 
-        if current_depth < max_depth:
-            # Simplify geometry and texture based on the tileset depth
-            simplification_ratio = 1 / 4 ** (max_depth - current_depth)
-            tile.content.simplify(simplification_ratio if simplification_ratio > 0.03 else 0.03)
-            texture_scale = 1 / 2 ** (max_depth - current_depth)
-            tile.content.reduce_texture_resolution(texture_scale)
+        # Tileset.get can only rebuild tiles that were refined with REPLACE
+        if tile.content:
+            tile.content.get_object()['refine'] = refine.value
 
-        logger.debug(f'Successfully created the tile {tile.content.get_object().name}')
+        logger.debug(f'Successfully created the tile {object_name}')
 
         return tile
 
-    def get_children(self, current_depth: int, max_depth: int, parent_object_name: Object) -> list['Tile']:
+    def get_children(self, current_depth: int, max_depth: int, parent_object_name: Object, bounding_volume_type: enums.BoundingVolume) -> list['Tile']:
         if current_depth >= max_depth:
             return
 
         regex_pattern = rf'^{re.escape(parent_object_name)}_([0-3])$'
         children_objects = [object for object in bpy.data.objects if re.match(regex_pattern, object.name)]
 
-        return [Tile.get(child_object, current_depth, max_depth) for child_object in children_objects]
+        return [Tile.get(child_object, current_depth, max_depth, bounding_volume_type) for child_object in children_objects]
 
-    def create_children(self, current_depth: int, max_depth: int) -> list['Tile']:
+    def create_children(self, current_depth: int, max_depth: int, refine: enums.Refine, bounding_volume_type: enums.BoundingVolume) -> list['Tile']:
         """
         Recursively subdivides a tile, simplifies its geometry and texture, and creates children tiles.
         """
@@ -72,10 +137,18 @@ class Tile(BaseSchema):
         current_depth += 1
 
         # Recursively create child tiles for further subdivision
-        return [Tile.create(child_object, current_depth, max_depth) for child_object in children_objects]
+        return [Tile.create(child_object, current_depth, max_depth, refine, bounding_volume_type) for child_object in children_objects]
+
+    def save(self, folder_path: str, export_normals: bool = True, draco_compression: bool = True):
+        if self.content:
+            self.content.save(folder_path, export_normals, draco_compression)
+
+        for child in self.children or []:
+            child.save(folder_path, export_normals, draco_compression)
 
-    def save(self, folder_path: str):
-        self.content.save(folder_path)
+    def load_content_statistics(self, folder_path: str):
+        if self.content and self.content.uri:
+            self.content.load_statistics(folder_path)
 
-        for child in self.children:
-            child.save(folder_path)
+        for child in self.children or []:
+            child.load_content_statistics(folder_path)
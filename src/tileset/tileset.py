@@ -1,30 +1,79 @@
-import bpy
-from bpy.types import Object
+from typing import Optional
 
-from src import utils
+from pydantic import model_validator
+
+from src import enums, utils
+from src.utils.blender import Object, bpy
 from src.utils.pydantic import BaseSchema
 
 from .tile import Tile
 
+# Transform of the root tile, which rotates the Z-up Blender coordinates of the bounding volumes to the Y-up coordinates of the glTF content
+ROOT_TRANSFORM = [1, 0, 0, 0, 0, 0, -1, 0, 0, 1, 0, 0, 0, 0, 0, 1]
+
+
+class TilesetExtras(BaseSchema):
+    # Origin of the tileset in the coordinates of the source data, which Chunk.create subtracts from all vertices
+    center: list[float]
+
 
 class Tileset(BaseSchema):
     asset: dict = {'version': '1.0'}
+    # Tilesets saved before the top-level geometric error was written don't contain it, so it's filled in from the root tile on validation
+    geometric_error: Optional[float] = None
     root: Tile
+    extras: Optional[TilesetExtras] = None
+
+    @model_validator(mode='after')
+    def fill_geometric_error(self) -> 'Tileset':
+        if self.geometric_error is None:
+            self.geometric_error = self.get_root_geometric_error(self.root)
+        return self
+
+    @staticmethod
+    def get_root_geometric_error(root: Tile) -> float:
+        # Not rendering the tileset at all misses geometry as large as its root tile
+        return 2 * root.bounding_volume.get_radius()
+
+    @classmethod
+    def from_root(cls, root: Tile, center: list[float]) -> 'Tileset':
+        return cls(geometric_error=cls.get_root_geometric_error(root), root=root, extras=TilesetExtras(center=center))
 
     @classmethod
-    def get(cls, grid_x: int, grid_y: int, max_depth: int) -> 'Tileset':
+    def get(cls, grid_x: int, grid_y: int, max_depth: int, bounding_volume_type: enums.BoundingVolume = enums.BoundingVolume.box) -> 'Tileset':
         object_name = f'chunk_{grid_x}_{grid_y}__1'
         object = bpy.data.objects.get(object_name)
         if object is None:
             raise Exception(f'Tileset root tile {object_name} could not be found')
+        if object.get('refine', enums.Refine.replace.value) != enums.Refine.replace.value:
+            raise Exception(f'Tileset root tile {object_name} was created with ADD refinement and can only be saved from Tileset.create')
 
-        tile = Tile.get(object, current_depth=1, max_depth=max_depth)
-        tile.transform = [1, 0, 0, 0, 0, 0, -1, 0, 0, 1, 0, 0, 0, 0, 0, 1]
+        tile = Tile.get(object, current_depth=1, max_depth=max_depth, bounding_volume_type=bounding_volume_type)
+        tile.transform = ROOT_TRANSFORM
 
-        return cls(root=tile)
+        return cls.from_root(tile, center=utils.object.get_center(object))
 
     @classmethod
-    def create(cls, object: Object, max_depth: int) -> 'Tileset':
+    def load(cls, folder_path: str) -> 'Tileset':
+        """
+        Loads a saved tileset from its tileset.json and the headers of its GLB files, without requiring Blender.
+        """
+
+        with open(f'{folder_path}/tileset.json') as json_file:
+            tileset = cls.model_validate_json(json_file.read())
+
+        tileset.root.load_content_statistics(folder_path)
+
+        return tileset
+
+    @classmethod
+    def create(
+        cls,
+        object: Object,
+        max_depth: int,
+        refine: enums.Refine = enums.Refine.replace,
+        bounding_volume_type: enums.BoundingVolume = enums.BoundingVolume.box,
+    ) -> 'Tileset':
         if len(object.data.materials) != 1:
             raise Exception('Tileset can only be created with an object that only has one material assigned')
         image_nodes = utils.object.get_image_nodes(object)
@@ -33,14 +82,24 @@ class Tileset(BaseSchema):
 
         object.name += '__1'
         object.data.materials[0].name = object.name
+        # Read before creating the tiles, as the object is replaced when refining with ADD
+        center = utils.object.get_center(object)
+
+        tile = Tile.create(object, current_depth=1, max_depth=max_depth, refine=refine, bounding_volume_type=bounding_volume_type)
+        tile.transform = ROOT_TRANSFORM
 
-        tile = Tile.create(object, current_depth=1, max_depth=max_depth)
-        tile.transform = [1, 0, 0, 0, 0, 0, -1, 0, 0, 1, 0, 0, 0, 0, 0, 1]
+        return cls.from_root(tile, center)
 
-        return cls(geometric_error=1, root=tile)
+    def save(self, folder_path: str, export_normals: bool = True, draco_compression: bool = True):
+        """
+        Saves the contents of all tiles as GLB and the tileset JSON.
+        Draco compression gives the smallest files, but reorders the vertices and faces itself, so the contents are only sorted spatially without it.
+        Saving without Draco keeps the spatial order for a better vertex cache use on the GPU and avoids decoding on the client, for larger downloads.
+        """
 
-    def save(self, folder_path: str):
-        self.root.save(folder_path)
+        self.root.save(folder_path, export_normals, draco_compression)
+        self.save_json(folder_path)
 
+    def save_json(self, folder_path: str):
         with open(f'{folder_path}/tileset.json', 'w') as json_file:
             json_file.write(self.model_dump_json(exclude_none=True, by_alias=True))
@@ -1 +1,13 @@
-from . import image, material, object, pydantic, tile, uv
+import importlib
+
+from . import blender, geometry, glb, obj, pydantic
+
+# Modules requiring Blender are only imported when used, see utils.blender
+BLENDER_MODULE_NAMES = ['image', 'material', 'object', 'tile', 'tiled_image', 'uv']
+
+
+def __getattr__(name: str):
+    if name in BLENDER_MODULE_NAMES:
+        return importlib.import_module(f'.{name}', __name__)
+
+    raise AttributeError(f'module {__name__!r} has no attribute {name!r}')
@@ -0,0 +1,10 @@
+from typing import Any
+
+# Saved tilesets can be loaded without Blender (see Tileset.load), so the modules used for that import bpy from here.
+# Outside of Blender, bpy is None and Object is only a placeholder for type annotations.
+try:
+    import bpy
+    from bpy.types import Object
+except ImportError:
+    bpy = None
+    Object = Any
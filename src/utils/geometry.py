@@ -0,0 +1,370 @@
+import itertools
+
+import numpy as np
+
+from src.utils.blender import Object
+
+
+def get_vertex_positions(object: Object) -> np.ndarray:
+    """
+    Returns the world space positions of all vertices of the object as an array of shape (n, 3).
+    """
+
+    mesh = object.data
+    # Blender stores coordinates as 32-bit floats, which foreach_get only copies directly into a buffer of the same type
+    positions = np.empty(len(mesh.vertices) * 3, dtype=np.float32)
+    mesh.vertices.foreach_get('co', positions)
+    positions = positions.reshape(-1, 3).astype(np.float64)
+
+    matrix_world = np.array(object.matrix_world, dtype=np.float64)
+
+    return positions @ matrix_world[:3, :3].T + matrix_world[:3, 3]
+
+
+def fit_box(positions: np.ndarray, axes: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Fits a box with the given orthonormal axes (as rows) around the positions and returns its center and half axes (as rows).
+    """
+
+    projections = positions @ axes.T
+    min_projection = projections.min(axis=0)
+    max_projection = projections.max(axis=0)
+
+    center = ((min_projection + max_projection) / 2) @ axes
+    half_axes = axes * ((max_projection - min_projection) / 2)[:, np.newaxis]
+
+    return (center, half_axes)
+
+
+def get_principal_axes(points: np.ndarray) -> np.ndarray:
+    """
+    Returns the principal axes (as rows) of the points, calculated from the eigenvectors of their covariance matrix.
+    """
+
+    covariance = np.atleast_2d(np.cov(points - points.mean(axis=0), rowvar=False))
+    _, eigenvectors = np.linalg.eigh(covariance)
+
+    return eigenvectors.T
+
+
+class GeometryStats:
+    """
+    Bounds of a tile's geometry, calculated once from its vertex positions.
+    """
+
+    def __init__(self, positions: np.ndarray):
+        if len(positions) == 0:
+            raise Exception('Geometry stats can only be calculated for geometry with vertices')
+
+        self.min_bound = positions.min(axis=0)
+        self.max_bound = positions.max(axis=0)
+        self.axis_lengths = self.max_bound - self.min_bound
+        self.diagonal = float(np.linalg.norm(self.axis_lengths))
+
+        (self.box_center, self.box_half_axes) = self.fit_oriented_box(positions)
+
+        # The sphere is centered on the box, but only needs to reach the farthest vertex instead of the box corners
+        self.sphere_center = self.box_center
+        self.sphere_radius = float(np.linalg.norm(positions - self.sphere_center, axis=1).max())
+
+    @classmethod
+    def from_object(cls, object: Object) -> 'GeometryStats':
+        return cls(get_vertex_positions(object))
+
+    def fit_oriented_box(self, positions: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+        """
+        Fits the smallest of an axis-aligned box, a box aligned to the principal axes, and a box aligned to the horizontal principal axes.
+        """
+
+        candidate_axes = [np.eye(3)]
+
+        if len(positions) > 1:
+            candidate_axes.append(get_principal_axes(positions))
+
+            # Tiles of terrain and streets are mostly oriented horizontally, so fitting only the horizontal axes is often the tightest
+            horizontal_axes = np.eye(3)
+            horizontal_axes[:2, :2] = get_principal_axes(positions[:, :2])
+            candidate_axes.append(horizontal_axes)
+
+        boxes = [fit_box(positions, axes) for axes in candidate_axes]
+
+        # Compare the volumes, falling back to the surface areas for flat boxes
+        def get_size(box: tuple[np.ndarray, np.ndarray]) -> tuple[float, float]:
+            lengths = np.linalg.norm(box[1], axis=1)
+            return (np.prod(lengths), lengths[0] * lengths[1] + lengths[1] * lengths[2] + lengths[0] * lengths[2])
+
+        return min(boxes, key=get_size)
+
+
+def get_loop_starts(loop_totals: np.ndarray) -> np.ndarray:
+    return np.concatenate([[0], np.cumsum(loop_totals)[:-1]]).astype(np.int64) if len(loop_totals) else np.zeros(0, dtype=np.int64)
+
+
+def get_next_loop_indices(loop_starts: np.ndarray, loop_totals: np.ndarray) -> np.ndarray:
+    """
+    Returns the index of the following loop within the same polygon for each loop, wrapping around at the end of each polygon.
+    """
+
+    loop_polygon_indices = np.repeat(np.arange(len(loop_totals)), loop_totals)
+    next_loop_indices = np.arange(len(loop_polygon_indices)) + 1
+    last_loop_indices = loop_starts + loop_totals - 1
+    next_loop_indices[last_loop_indices[loop_totals > 0]] = loop_starts[loop_totals > 0]
+
+    return next_loop_indices
+
+
+def get_connected_components(count: int, pairs: np.ndarray) -> np.ndarray:
+    """
+    Returns the component of each element, given as the smallest element index of the component, for elements connected by the (n, 2) index pairs.
+    """
+
+    labels = np.arange(count)
+
+    while True:
+        # Hook the larger root of each connected pair onto the smaller one
+        roots_a = labels[pairs[:, 0]]
+        roots_b = labels[pairs[:, 1]]
+        np.minimum.at(labels, np.maximum(roots_a, roots_b), np.minimum(roots_a, roots_b))
+
+        # Compress the paths, so every element points directly to its root again
+        while True:
+            parent_labels = labels[labels]
+            if np.array_equal(parent_labels, labels):
+                break
+            labels = parent_labels
+
+        if np.array_equal(labels[pairs[:, 0]], labels[pairs[:, 1]]):
+            return labels
+
+
+def get_planar_regions(
+    polygon_normals: np.ndarray, loop_totals: np.ndarray, loop_vertex_indices: np.ndarray, loop_edge_indices: np.ndarray, loop_uvs: np.ndarray, angle_limit: float
+) -> np.ndarray:
+    """
+    Returns the region of each polygon, grown like a limited dissolve across edges between two polygons whose normals differ less than the angle limit.
+    Polygons deviating more than the angle limit from the mean normal of their region are split off, so slowly curving surfaces don't grow into one region.
+    Regions don't grow across UV seams, so the texture of a region can still be mapped once it's dissolved into fewer faces.
+    """
+
+    next_loop_indices = get_next_loop_indices(get_loop_starts(loop_totals), loop_totals)
+    loop_polygon_indices = np.repeat(np.arange(len(loop_totals)), loop_totals)
+
+    # Find the two loops of each edge that is shared by exactly two polygons
+    loop_order = np.argsort(loop_edge_indices, kind='stable')
+    sorted_edge_indices = loop_edge_indices[loop_order]
+    edge_loop_counts = np.bincount(loop_edge_indices)
+    is_pair = (sorted_edge_indices[:-1] == sorted_edge_indices[1:]) & (edge_loop_counts[sorted_edge_indices[:-1]] == 2)
+    loops_a = loop_order[:-1][is_pair]
+    loops_b = loop_order[1:][is_pair]
+    polygons_a = loop_polygon_indices[loops_a]
+    polygons_b = loop_polygon_indices[loops_b]
+
+    is_planar = np.sum(polygon_normals[polygons_a] * polygon_normals[polygons_b], axis=1) >= np.cos(angle_limit)
+
+    # Neighbouring polygons usually run along the shared edge in opposite directions, so the UVs of the same vertex are found at different loops
+    is_same_direction = loop_vertex_indices[loops_a] == loop_vertex_indices[loops_b]
+    loops_b_start = np.where(is_same_direction, loops_b, next_loop_indices[loops_b])
+    loops_b_end = np.where(is_same_direction, next_loop_indices[loops_b], loops_b)
+    is_start_continuous = np.all(np.abs(loop_uvs[loops_a] - loop_uvs[loops_b_start]) < 1e-6, axis=1)
+    is_end_continuous = np.all(np.abs(loop_uvs[next_loop_indices[loops_a]] - loop_uvs[loops_b_end]) < 1e-6, axis=1)
+
+    connected_pairs = np.stack([polygons_a, polygons_b], axis=1)[is_planar & is_start_continuous & is_end_continuous]
+
+    while True:
+        region_indices = get_connected_components(len(loop_totals), connected_pairs)
+        mean_normals = np.zeros_like(polygon_normals, dtype=np.float64)
+        np.add.at(mean_normals, region_indices, polygon_normals)
+        mean_normals /= np.maximum(np.linalg.norm(mean_normals, axis=1, keepdims=True), 1e-12)
+
+        # Disconnect the deviating polygons from their region and grow the regions again, as their mean normals change
+        is_deviating = np.sum(polygon_normals * mean_normals[region_indices], axis=1) < np.cos(angle_limit)
+        if not is_deviating.any():
+            return region_indices
+        connected_pairs = connected_pairs[~is_deviating[connected_pairs].any(axis=1)]
+
+
+def get_close_vertex_pairs(positions: np.ndarray, distance: float) -> np.ndarray:
+    """
+    Returns the (n, 2) index pairs of all vertices that are at most the given distance apart.
+    Vertices are sorted into a grid with the distance as cell size, so each vertex only has to be compared with the vertices of its own and neighbouring cells.
+    """
+
+    cell_dtype = np.dtype([('x', np.int64), ('y', np.int64), ('z', np.int64)])
+    cells = np.floor(positions / distance).astype(np.int64)
+    cell_keys = np.ascontiguousarray(cells).view(cell_dtype).reshape(-1)
+    unique_cell_keys, cell_indices, cell_counts = np.unique(cell_keys, return_inverse=True, return_counts=True)
+    # Vertices ordered by their cell, with the start of each cell in that order
+    cell_vertex_indices = np.argsort(cell_indices.reshape(-1), kind='stable')
+    cell_starts = np.cumsum(cell_counts) - cell_counts
+
+    pairs = [np.empty((0, 2), dtype=np.int64)]
+    # Only the own cell and the 13 neighbouring cells in the positive half are visited, so each pair of cells is compared once
+    for offset in itertools.product([-1, 0, 1], repeat=3):
+        if offset < (0, 0, 0):
+            continue
+
+        neighbour_keys = np.ascontiguousarray(cells + offset).view(cell_dtype).reshape(-1)
+        neighbour_cell_indices = np.minimum(np.searchsorted(unique_cell_keys, neighbour_keys), len(unique_cell_keys) - 1)
+        has_neighbour = unique_cell_keys[neighbour_cell_indices] == neighbour_keys
+        neighbour_cell_indices = neighbour_cell_indices[has_neighbour]
+
+        # Pair each vertex with every vertex of its neighbouring cell
+        counts = cell_counts[neighbour_cell_indices]
+        vertex_indices = np.repeat(np.flatnonzero(has_neighbour), counts)
+        positions_in_cell = np.arange(counts.sum()) - np.repeat(np.cumsum(counts) - counts, counts)
+        neighbour_vertex_indices = cell_vertex_indices[np.repeat(cell_starts[neighbour_cell_indices], counts) + positions_in_cell]
+
+        is_close = np.linalg.norm(positions[vertex_indices] - positions[neighbour_vertex_indices], axis=1) <= distance
+        if offset == (0, 0, 0):
+            is_close &= vertex_indices < neighbour_vertex_indices
+        pairs.append(np.stack([vertex_indices[is_close], neighbour_vertex_indices[is_close]], axis=1))
+
+    return np.concatenate(pairs)
+
+
+def get_edge_source_indices(source_edge_vertex_indices: np.ndarray, vertex_map: np.ndarray, edge_vertex_indices: np.ndarray) -> np.ndarray:
+    """
+    Returns the index of a source edge connecting the same vertices for each (n, 2) edge of a cleaned mesh, or -1 if there is none.
+    The vertex map gives the new index of each source vertex, or -1 for removed vertices.
+    """
+
+    vertex_count = max(int(vertex_map.max(initial=-1)) + 1, 1)
+    mapped_vertex_indices = np.sort(vertex_map[source_edge_vertex_indices], axis=1)
+    source_edge_indices = np.flatnonzero((mapped_vertex_indices[:, 0] >= 0) & (mapped_vertex_indices[:, 0] != mapped_vertex_indices[:, 1]))
+
+    # Edges are compared by a single key of their sorted vertex indices
+    source_keys = mapped_vertex_indices[source_edge_indices, 0].astype(np.int64) * vertex_count + mapped_vertex_indices[source_edge_indices, 1]
+    source_order = np.argsort(source_keys, kind='stable')
+    source_keys = source_keys[source_order]
+    edge_vertex_indices = np.sort(edge_vertex_indices, axis=1)
+    keys = edge_vertex_indices[:, 0].astype(np.int64) * vertex_count + edge_vertex_indices[:, 1]
+
+    if len(source_keys) == 0:
+        return np.full(len(keys), -1)
+    positions = np.minimum(np.searchsorted(source_keys, keys), len(source_keys) - 1)
+
+    return np.where(source_keys[positions] == keys, source_edge_indices[source_order[positions]], -1)
+
+
+class CleanedMesh:
+    """
+    Result of cleaning mesh arrays, with the indices of the kept source vertices, polygons and loops to carry over their attributes.
+    """
+
+    def __init__(self, positions: np.ndarray, loop_totals: np.ndarray, loop_vertex_indices: np.ndarray, polygon_indices: np.ndarray, loop_indices: np.ndarray):
+        self.positions = positions
+        self.loop_totals = loop_totals
+        self.loop_vertex_indices = loop_vertex_indices
+        self.polygon_indices = polygon_indices
+        self.loop_indices = loop_indices
+        self.vertex_indices = np.arange(len(positions))
+        # New index of each source vertex, or -1 if it was removed
+        self.vertex_map = np.arange(len(positions))
+
+        self.removed_vertex_count = 0
+        self.removed_degenerate_face_count = 0
+        self.removed_duplicate_face_count = 0
+
+    def get_loop_starts(self) -> np.ndarray:
+        return get_loop_starts(self.loop_totals)
+
+    def keep_loops(self, loop_mask: np.ndarray):
+        """
+        Keeps only the masked loops and removes polygons that are left with less than three loops.
+        """
+
+        loop_polygon_indices = np.repeat(np.arange(len(self.loop_totals)), self.loop_totals)
+        loop_totals = np.bincount(loop_polygon_indices[loop_mask], minlength=len(self.loop_totals))
+        polygon_mask = loop_totals >= 3
+        loop_mask = loop_mask & polygon_mask[loop_polygon_indices]
+
+        self.loop_totals = loop_totals[polygon_mask]
+        self.polygon_indices = self.polygon_indices[polygon_mask]
+        self.loop_vertex_indices = self.loop_vertex_indices[loop_mask]
+        self.loop_indices = self.loop_indices[loop_mask]
+
+    def keep_polygons(self, polygon_mask: np.ndarray):
+        self.keep_loops(np.repeat(polygon_mask, self.loop_totals))
+
+    def weld_vertices(self, merge_distance: float):
+        """
+        Merges vertices that are at most the merge distance apart, like bmesh remove_doubles.
+        Merging is transitive, so a chain of close vertices becomes a single vertex at the position of its first vertex.
+        """
+
+        pairs = get_close_vertex_pairs(self.positions, merge_distance)
+        # The component label of each vertex is the index of the first vertex of its component
+        kept_vertex_indices, vertex_map = np.unique(get_connected_components(len(self.positions), pairs), return_inverse=True)
+        vertex_map = vertex_map.reshape(-1)
+
+        self.positions = self.positions[kept_vertex_indices]
+        self.vertex_indices = self.vertex_indices[kept_vertex_indices]
+        self.vertex_map = vertex_map[self.vertex_map]
+        self.loop_vertex_indices = vertex_map[self.loop_vertex_indices]
+
+    def remove_degenerate_faces(self, min_area: float):
+        """
+        Collapses repeated consecutive vertices of each face and removes faces with less than three vertices or without area.
+        """
+
+        polygon_count = len(self.loop_totals)
+
+        next_loop_indices = get_next_loop_indices(self.get_loop_starts(), self.loop_totals)
+        self.keep_loops(self.loop_vertex_indices != self.loop_vertex_indices[next_loop_indices])
+
+        # Calculate the face areas with Newell's method, which also works for non planar polygons
+        if len(self.loop_totals):
+            loop_starts = self.get_loop_starts()
+            next_loop_indices = get_next_loop_indices(loop_starts, self.loop_totals)
+            # Positions are taken relative to the first vertex of their face, as the cross products of large coordinates (e.g. UTM) cancel out imprecisely
+            loop_positions = self.positions[self.loop_vertex_indices] - np.repeat(self.positions[self.loop_vertex_indices[loop_starts]], self.loop_totals, axis=0)
+            crosses = np.cross(loop_positions, loop_positions[next_loop_indices])
+            areas = np.linalg.norm(np.add.reduceat(crosses, loop_starts, axis=0), axis=1) / 2
+            self.keep_polygons(areas > min_area)
+
+        self.removed_degenerate_face_count += polygon_count - len(self.loop_totals)
+
+    def remove_duplicate_faces(self):
+        """
+        Removes faces using the same vertices as an earlier face, regardless of their winding.
+        """
+
+        polygon_mask = np.zeros(len(self.loop_totals), dtype=bool)
+        loop_starts = self.get_loop_starts()
+
+        # Faces are compared in groups of the same vertex count, so their sorted vertex indices can be stacked into one array
+        for loop_total in np.unique(self.loop_totals):
+            polygon_indices = np.flatnonzero(self.loop_totals == loop_total)
+            vertex_indices = self.loop_vertex_indices[loop_starts[polygon_indices, np.newaxis] + np.arange(loop_total)]
+            _, first_indices = np.unique(np.sort(vertex_indices, axis=1), axis=0, return_index=True)
+            polygon_mask[polygon_indices[first_indices]] = True
+
+        self.removed_duplicate_face_count += len(self.loop_totals) - int(polygon_mask.sum())
+        self.keep_polygons(polygon_mask)
+
+    def remove_unused_vertices(self):
+        used_vertex_indices, loop_vertex_indices = np.unique(self.loop_vertex_indices, return_inverse=True)
+        new_vertex_indices = np.full(len(self.positions), -1)
+        new_vertex_indices[used_vertex_indices] = np.arange(len(used_vertex_indices))
+
+        self.positions = self.positions[used_vertex_indices]
+        self.vertex_indices = self.vertex_indices[used_vertex_indices]
+        self.vertex_map = new_vertex_indices[self.vertex_map]
+        self.loop_vertex_indices = loop_vertex_indices.reshape(-1)
+
+
+def clean_mesh(positions: np.ndarray, loop_totals: np.ndarray, loop_vertex_indices: np.ndarray, merge_distance: float) -> CleanedMesh:
+    """
+    Welds vertices, removes degenerate and duplicate faces and drops unused vertices, working on mesh arrays only.
+    """
+
+    cleaned_mesh = CleanedMesh(positions, loop_totals, loop_vertex_indices, polygon_indices=np.arange(len(loop_totals)), loop_indices=np.arange(len(loop_vertex_indices)))
+
+    cleaned_mesh.weld_vertices(merge_distance)
+    cleaned_mesh.remove_degenerate_faces(min_area=merge_distance**2)
+    cleaned_mesh.remove_duplicate_faces()
+    cleaned_mesh.remove_unused_vertices()
+
+    cleaned_mesh.removed_vertex_count = len(positions) - len(cleaned_mesh.positions)
+
+    return cleaned_mesh
@@ -0,0 +1,121 @@
+import json
+import struct
+from typing import Any, Optional
+
+GLB_MAGIC = 0x46546C67  # 'glTF'
+JSON_CHUNK_TYPE = 0x4E4F534A  # 'JSON'
+BINARY_CHUNK_HEADER_LENGTH = 8
+
+# Number of bytes read from the start of an embedded image to find its dimensions
+IMAGE_HEADER_LENGTH = 64 * 1024
+
+TRIANGLES_MODE = 4
+TRIANGLE_STRIP_MODE = 5
+TRIANGLE_FAN_MODE = 6
+
+
+def read_json_chunk(file_path: str) -> dict[str, Any]:
+    """
+    Reads the JSON chunk of a GLB file without loading its binary buffer.
+    """
+
+    with open(file_path, 'rb') as file:
+        magic, _version, _length = struct.unpack('<III', file.read(12))
+        if magic != GLB_MAGIC:
+            raise Exception(f'File {file_path} is not a valid GLB file')
+
+        chunk_length, chunk_type = struct.unpack('<II', file.read(8))
+        if chunk_type != JSON_CHUNK_TYPE:
+            raise Exception(f'File {file_path} does not start with a JSON chunk')
+
+        return json.loads(file.read(chunk_length))
+
+
+def count_triangles(gltf: dict[str, Any]) -> int:
+    """
+    Counts the triangles of all mesh primitives, using the accessor counts declared in the glTF JSON.
+    """
+
+    accessors = gltf.get('accessors', [])
+    triangle_count = 0
+
+    for mesh in gltf.get('meshes', []):
+        for primitive in mesh.get('primitives', []):
+            # Indexed primitives are counted by their indices, others by their vertex positions
+            if 'indices' in primitive:
+                count = accessors[primitive['indices']]['count']
+            else:
+                count = accessors[primitive['attributes']['POSITION']]['count']
+
+            mode = primitive.get('mode', TRIANGLES_MODE)
+            if mode == TRIANGLES_MODE:
+                triangle_count += count // 3
+            elif mode in (TRIANGLE_STRIP_MODE, TRIANGLE_FAN_MODE):
+                triangle_count += max(count - 2, 0)
+
+    return triangle_count
+
+
+def get_image_size(header: bytes) -> Optional[tuple[int, int]]:
+    """
+    Reads the width and height from the header of a PNG, JPEG or WebP image, without decoding it.
+    """
+
+    # PNG: the IHDR chunk directly follows the signature
+    if header[:8] == b'\x89PNG\r\n\x1a\n':
+        return struct.unpack('>II', header[16:24])
+
+    # WebP: the dimensions are stored differently for lossy, lossless and extended images
+    if header[:4] == b'RIFF' and header[8:12] == b'WEBP':
+        chunk_type = header[12:16]
+        if chunk_type == b'VP8 ':
+            (width, height) = struct.unpack('<HH', header[26:30])
+            return (width & 0x3FFF, height & 0x3FFF)
+        if chunk_type == b'VP8L':
+            bits = int.from_bytes(header[21:25], 'little')
+            return ((bits & 0x3FFF) + 1, ((bits >> 14) & 0x3FFF) + 1)
+        if chunk_type == b'VP8X':
+            return (int.from_bytes(header[24:27], 'little') + 1, int.from_bytes(header[27:30], 'little') + 1)
+        return None
+
+    # JPEG: the dimensions are stored in the start of frame segment
+    if header[:2] == b'\xff\xd8':
+        offset = 2
+        while offset + 9 <= len(header):
+            if header[offset] != 0xFF:
+                return None
+            marker = header[offset + 1]
+            if 0xC0 <= marker <= 0xCF and marker not in (0xC4, 0xC8, 0xCC):
+                (height, width) = struct.unpack('>HH', header[offset + 5 : offset + 9])
+                return (width, height)
+            (segment_length,) = struct.unpack('>H', header[offset + 2 : offset + 4])
+            offset += 2 + segment_length
+
+    return None
+
+
+def read_image_sizes(file_path: str, gltf: dict[str, Any]) -> list[tuple[int, int]]:
+    """
+    Reads the dimensions of all images embedded in the binary chunk of a GLB file, reading only their headers.
+    """
+
+    buffer_views = gltf.get('bufferViews', [])
+    image_sizes: list[tuple[int, int]] = []
+
+    with open(file_path, 'rb') as file:
+        # The binary chunk follows the 12 byte file header and the JSON chunk
+        file.seek(12)
+        (json_chunk_length,) = struct.unpack('<I', file.read(4))
+        binary_data_offset = 12 + 8 + json_chunk_length + BINARY_CHUNK_HEADER_LENGTH
+
+        for image in gltf.get('images', []):
+            if 'bufferView' not in image:
+                continue
+
+            buffer_view = buffer_views[image['bufferView']]
+            file.seek(binary_data_offset + buffer_view.get('byteOffset', 0))
+            image_size = get_image_size(file.read(min(buffer_view['byteLength'], IMAGE_HEADER_LENGTH)))
+            if image_size is not None:
+                image_sizes.append(image_size)
+
+    return image_sizes
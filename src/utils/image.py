@@ -1,12 +1,14 @@
 import bpy
+import numpy as np
 from bpy.types import Image, Material, MeshUVLoopLayer, Object, ShaderNodeTexImage
 
 from src import utils
+from src.utils.tiled_image import TiledImage
 
 
-def get_ideal_size(object: Object, image: Image, uv_layer: MeshUVLoopLayer) -> tuple[int, int]:
+def get_ideal_size(object: Object, image: Image, uv_layer: MeshUVLoopLayer, texture_scale: float = 1) -> tuple[int, int]:
     """
-    Calculate the ideal size of an image to fit only the UV-mapped area of the given object.
+    Calculate the ideal size of an image to fit only the UV-mapped area of the given object, scaled by the texture scale.
     """
 
     # Initialize minimum and maximum UV bounds
@@ -28,15 +30,44 @@ def get_ideal_size(object: Object, image: Image, uv_layer: MeshUVLoopLayer) -> t
     # Calculate ideal image dimensions to match the UV-mapped area
     current_image_width = image.size[0]
     current_image_height = image.size[1]
-    ideal_image_width = int(current_image_width * uv_width)
-    ideal_image_height = int(current_image_height * uv_height)
+    ideal_image_width = max(int(current_image_width * uv_width * texture_scale), 1)
+    ideal_image_height = max(int(current_image_height * uv_height * texture_scale), 1)
 
     return (ideal_image_width, ideal_image_height)
 
 
-def remove_unused_pixels(image_node: ShaderNodeTexImage, material: Material, object: Object, new_uv_layer_name: str):
+def crop_to_uv_bounds(image_node: ShaderNodeTexImage, object: Object, tiled_image: TiledImage, new_image_name: str):
+    """
+    Replaces the image of the node with the area of the tiled image covered by the object's active UV layer, and maps the UVs into that area.
+    This allows baking a tile from a small crop of the texture it was subdivided from, instead of the full texture.
+    """
+
+    uv_layer = object.data.uv_layers.active
+    uvs = np.empty(len(uv_layer.data) * 2, dtype=np.float32)
+    uv_layer.data.foreach_get('uv', uvs)
+    uvs = uvs.reshape(-1, 2)
+    size = np.array([tiled_image.width, tiled_image.height])
+
+    if len(uvs) == 0 or uvs.min() < 0 or uvs.max() > 1:
+        # Textures repeating outside of the unit square can't be cropped
+        (x, y, width, height) = (0, 0, tiled_image.width, tiled_image.height)
+    else:
+        # Keep a margin of one pixel, as the texture is interpolated with its neighbouring pixels
+        (x, y) = np.maximum(np.floor(uvs.min(axis=0) * size).astype(int) - 1, 0)
+        (x_end, y_end) = np.minimum(np.ceil(uvs.max(axis=0) * size).astype(int) + 1, size)
+        (x, y, width, height) = (int(x), int(y), int(x_end - x), int(y_end - y))
+
+    cropped_image = tiled_image.crop(x, y, width, height)
+    image_node.image = cropped_image.to_image(new_image_name)
+    cropped_image.remove()
+
+    utils.uv.transform(uv_layer, scale=(tiled_image.width / width, tiled_image.height / height), offset=(-x / width, -y / height))
+
+
+def remove_unused_pixels(image_node: ShaderNodeTexImage, material: Material, object: Object, new_uv_layer_name: str, texture_scale: float = 1):
     """
     Create a trimmed version of an image texture by removing unused pixels that are not covered by the UV map.
+    The texture scale allows baking directly at a lower resolution instead of downscaling the result afterwards.
     """
 
     bpy.ops.object.select_all(action='DESELECT')
@@ -50,8 +81,8 @@ def remove_unused_pixels(image_node: ShaderNodeTexImage, material: Material, obj
     bpy.context.view_layer.objects.active = object
     utils.uv.pack_islands(scale=False, margin=0)
 
-    # Calculate ideal image size based on UV-mapped area
-    ideal_texture_width, ideal_texture_height = get_ideal_size(object, image_node.image, uv_layer=object.data.uv_layers.active)
+    # Calculate ideal image size based on UV-mapped area and target texture scale
+    ideal_texture_width, ideal_texture_height = get_ideal_size(object, image_node.image, uv_layer=object.data.uv_layers.active, texture_scale=texture_scale)
     # Create a new empty image with the calculated size and add it to the material
     node_new_image = utils.material.add_empty_image(material, name=object.name, width=ideal_texture_width, height=ideal_texture_height)
 
@@ -3,6 +3,8 @@ from typing import Optional
 import bpy
 from bpy.types import Image, Material, ShaderNodeTexImage
 
+from src import utils
+
 
 def add_empty_image(material: Material, name: str, width: Optional[int], height: Optional[int], image: Optional[Image] = None) -> ShaderNodeTexImage:
     """
@@ -42,21 +44,17 @@ def change_texture_resolution(material: Material, texture_scale: float, new_imag
             if node.type == 'TEX_IMAGE' and node.image:
                 original_image: Image = node.image
 
-                # Check if image is packed, which ensures data is available in-memory
-                if not original_image.packed_file:
-                    original_image.pack()  # Embed image data into the .blend file
-
-                new_image = original_image.copy()
-                new_image.name = new_image_name
-
                 # Calculate new dimensions based on the texture scaling factor
-                new_width = int(new_image.size[0] * texture_scale)
-                new_height = int(new_image.size[1] * texture_scale)
+                new_width = max(int(original_image.size[0] * texture_scale), 1)
+                new_height = max(int(original_image.size[1] * texture_scale), 1)
 
-                # Apply the new dimensions to the copied image
-                new_image.scale(new_width, new_height)
+                # Downsample block by block from a memory-mapped copy, instead of duplicating the full resolution image in memory
+                tiled_image = utils.tiled_image.TiledImage.from_image(original_image)
+                downsampled_image = tiled_image.downsample(new_width, new_height)
+                tiled_image.remove()
 
                 # Assign the scaled image back to the texture node
-                node.image = new_image
+                node.image = downsampled_image.to_image(new_image_name, pack=True)
+                downsampled_image.remove()
 
     return material
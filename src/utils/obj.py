@@ -0,0 +1,275 @@
+import os
+import shutil
+import tempfile
+from array import array
+from typing import Optional
+
+import numpy as np
+
+# Maximum number of output lines held in memory over all buckets, before they are appended to the bucket files
+MAX_BUFFERED_LINE_COUNT = 1_000_000
+
+
+class IndexMap:
+    """
+    New index of each source element (vertex, UV coordinate or normal) in the buckets using it.
+    Most elements are only used by a single bucket, so the first use is stored in arrays and only the further uses along the cell borders in a dict.
+    """
+
+    def __init__(self, count: int):
+        self.bucket_indices = np.full(count, -1, dtype=np.int32)
+        self.new_indices = np.zeros(count, dtype=np.int32)
+        self.shared_new_indices: dict[tuple[int, int], int] = {}
+
+    def get(self, index: int, bucket_index: int) -> Optional[int]:
+        first_bucket_index = self.bucket_indices[index]
+        if first_bucket_index == bucket_index:
+            return int(self.new_indices[index])
+        if first_bucket_index == -1:
+            return None
+
+        return self.shared_new_indices.get((index, bucket_index))
+
+    def set(self, index: int, bucket_index: int, new_index: int):
+        if self.bucket_indices[index] == -1:
+            self.bucket_indices[index] = bucket_index
+            self.new_indices[index] = new_index
+        else:
+            self.shared_new_indices[(index, bucket_index)] = new_index
+
+
+class Bucket:
+    """
+    Output of one spatial cell of a split OBJ file. Vertex data is written as soon as a face of the cell uses it, with remapped indices.
+    Lines are buffered and appended to the files of the bucket when flushed, so no file stays open between flushes.
+    """
+
+    def __init__(self, folder_path: str, bucket_index: int):
+        self.bucket_index = bucket_index
+        self.file_paths = {element_type: os.path.join(folder_path, element_type) for element_type in ['v', 'vt', 'vn', 'f']}
+        self.lines: dict[str, list[str]] = {element_type: [] for element_type in self.file_paths}
+        self.counts = {'v': 0, 'vt': 0, 'vn': 0}
+        self.material_names: list[str] = []
+        self.current_material_name: Optional[str] = None
+        self.current_smoothing_group: Optional[str] = None
+
+    def write(self, element_type: str, line: str):
+        self.lines[element_type].append(line)
+
+    def get_index(self, element_type: str, index: int, values: np.ndarray, index_map: IndexMap) -> int:
+        new_index = index_map.get(index, self.bucket_index)
+        if new_index is None:
+            self.counts[element_type] += 1
+            new_index = self.counts[element_type]
+            index_map.set(index, self.bucket_index, new_index)
+            self.write(element_type, f'{element_type} {" ".join(repr(float(value)) for value in values[index])}\n')
+
+        return new_index
+
+    def write_face(self, face_vertices: list[dict[str, int]], values_by_type: dict[str, np.ndarray], index_maps: dict[str, IndexMap]):
+        face_vertex_strings = []
+        for indices in face_vertices:
+            new_indices = [
+                str(self.get_index(element_type, indices[element_type], values_by_type[element_type], index_maps[element_type])) if element_type in indices else ''
+                for element_type in ['v', 'vt', 'vn']
+            ]
+            # Omit trailing empty indices, e.g. 1/2 instead of 1/2/
+            face_vertex_strings.append('/'.join(new_indices).rstrip('/'))
+
+        self.write('f', f'f {" ".join(face_vertex_strings)}\n')
+
+    def get_buffered_line_count(self) -> int:
+        return sum(len(lines) for lines in self.lines.values())
+
+    def flush(self):
+        for element_type, lines in self.lines.items():
+            if lines:
+                with open(self.file_paths[element_type], 'a') as file:
+                    file.writelines(lines)
+                lines.clear()
+
+
+def get_quadrant_path(cell_x: int, cell_y: int, depth: int) -> list[int]:
+    """
+    Converts a grid cell into the quadrant indices of each subdivision level, using the same order as utils.object.subdivide.
+    """
+
+    quadrant_path = []
+    for level in reversed(range(depth)):
+        quadrant_path.append(((cell_x >> level) & 1) + 2 * ((cell_y >> level) & 1))
+
+    return quadrant_path
+
+
+def read_vertex_data(file_path: str) -> tuple[np.ndarray, np.ndarray, np.ndarray, list[str]]:
+    """
+    Reads the vertex positions, UV coordinates, normals and material libraries of an OBJ file.
+    """
+
+    positions, uvs, normals = array('d'), array('d'), array('d')
+    material_libraries = []
+
+    with open(file_path) as file:
+        for line in file:
+            if line.startswith('v '):
+                positions.extend(float(value) for value in line.split()[1:4])
+            elif line.startswith('vt '):
+                uvs.extend(float(value) for value in line.split()[1:3])
+            elif line.startswith('vn '):
+                normals.extend(float(value) for value in line.split()[1:4])
+            elif line.startswith('mtllib '):
+                material_libraries.append(line[len('mtllib ') :].strip())
+
+    return (np.frombuffer(positions).reshape(-1, 3), np.frombuffer(uvs).reshape(-1, 2), np.frombuffer(normals).reshape(-1, 3), material_libraries)
+
+
+def read_materials(file_path: str) -> dict[str, list[str]]:
+    """
+    Reads the definition lines of each material in an MTL file.
+    """
+
+    materials: dict[str, list[str]] = {}
+    material_lines: Optional[list[str]] = None
+
+    with open(file_path) as file:
+        for line in file:
+            if line.startswith('newmtl '):
+                material_lines = materials.setdefault(line[len('newmtl ') :].strip(), [])
+            elif material_lines is not None and line.strip():
+                material_lines.append(line.strip())
+
+    return materials
+
+
+def write_materials(file_path: str, materials: dict[str, list[str]], material_names: list[str], source_folder_path: str):
+    """
+    Writes the given materials to an MTL file, rewriting relative texture paths to stay valid from the new location.
+    """
+
+    with open(file_path, 'w') as file:
+        for material_name in material_names:
+            file.write(f'newmtl {material_name}\n')
+            for line in materials.get(material_name, []):
+                if line.startswith('map_') or line.startswith('bump') or line.startswith('disp'):
+                    values = line.split()
+                    if not os.path.isabs(values[-1]):
+                        texture_path = os.path.join(source_folder_path, values[-1])
+                        values[-1] = os.path.relpath(texture_path, os.path.dirname(file_path))
+                    line = ' '.join(values)
+                file.write(f'{line}\n')
+            file.write('\n')
+
+
+def split(file_path: str, folder_path: str, depth: int = 1) -> list[str]:
+    """
+    Splits an OBJ file into 4^depth spatial sub-chunks, so each one can be imported and processed independently.
+    Faces are assigned by their centroid to a regular grid over the XY bounds of the whole file. At depth 1 the cells match the quadrants of
+    utils.object.subdivide, deeper cells don't, as subdivide splits each quadrant again at the center of its own bounds.
+    The vertex data is held as arrays, while faces are streamed to the output files, which keeps the memory far below importing the whole file.
+    Materials and smoothing groups are carried over into each sub-chunk, while vertex colors and object and group names are dropped.
+    """
+
+    source_folder_path = os.path.dirname(os.path.abspath(file_path))
+    name = os.path.splitext(os.path.basename(file_path))[0]
+    os.makedirs(folder_path, exist_ok=True)
+
+    # The first pass only reads the vertex data, which is needed to locate the faces
+    (positions, uvs, normals, material_libraries) = read_vertex_data(file_path)
+    if len(positions) == 0:
+        raise Exception(f'OBJ file {file_path} does not contain any vertices')
+
+    min_bound = positions[:, :2].min(axis=0)
+    extent = np.maximum(positions[:, :2].max(axis=0) - min_bound, 1e-9)
+    cell_count = 2**depth
+
+    materials: dict[str, list[str]] = {}
+    for material_library in material_libraries:
+        materials.update(read_materials(os.path.join(source_folder_path, material_library)))
+
+    buckets: dict[tuple[int, int], Bucket] = {}
+    current_material_name: Optional[str] = None
+    current_smoothing_group: Optional[str] = None
+    # Running counts, needed to resolve negative (relative) indices
+    counts = {'v': 0, 'vt': 0, 'vn': 0}
+    values_by_type = {'v': positions, 'vt': uvs, 'vn': normals}
+    index_maps = {element_type: IndexMap(len(values)) for element_type, values in values_by_type.items()}
+    buffered_line_count = 0
+
+    with tempfile.TemporaryDirectory(dir=folder_path) as temporary_folder_path:
+        # The second pass streams the faces into the bucket of their centroid
+        with open(file_path) as file:
+            for line in file:
+                if line.startswith('v '):
+                    counts['v'] += 1
+                elif line.startswith('vt '):
+                    counts['vt'] += 1
+                elif line.startswith('vn '):
+                    counts['vn'] += 1
+                elif line.startswith('usemtl '):
+                    current_material_name = line[len('usemtl ') :].strip()
+                elif line.startswith('s '):
+                    current_smoothing_group = line[len('s ') :].strip()
+                elif line.startswith('f '):
+                    # Each face vertex is given as v, v/vt, v//vn or v/vt/vn with 1-based or negative indices
+                    face_vertices = []
+                    for face_vertex in line.split()[1:]:
+                        indices = {}
+                        for element_type, value in zip(['v', 'vt', 'vn'], face_vertex.split('/')):
+                            if value:
+                                index = int(value)
+                                indices[element_type] = index - 1 if index > 0 else counts[element_type] + index
+                        face_vertices.append(indices)
+
+                    centroid = positions[[indices['v'] for indices in face_vertices], :2].mean(axis=0)
+                    (cell_x, cell_y) = np.clip(((centroid - min_bound) / extent * cell_count).astype(int), 0, cell_count - 1)
+
+                    bucket = buckets.get((cell_x, cell_y))
+                    if bucket is None:
+                        bucket_folder_path = os.path.join(temporary_folder_path, f'{cell_x}_{cell_y}')
+                        os.makedirs(bucket_folder_path)
+                        bucket = Bucket(bucket_folder_path, bucket_index=len(buckets))
+                        buckets[(cell_x, cell_y)] = bucket
+
+                    line_count = bucket.get_buffered_line_count()
+
+                    if current_material_name is not None and current_material_name != bucket.current_material_name:
+                        bucket.write('f', f'usemtl {current_material_name}\n')
+                        bucket.current_material_name = current_material_name
+                        if current_material_name not in bucket.material_names:
+                            bucket.material_names.append(current_material_name)
+                    # Smoothing groups are repeated in each bucket whenever they change, as they control the imported shading
+                    if current_smoothing_group is not None and current_smoothing_group != bucket.current_smoothing_group:
+                        bucket.write('f', f's {current_smoothing_group}\n')
+                        bucket.current_smoothing_group = current_smoothing_group
+
+                    bucket.write_face(face_vertices, values_by_type, index_maps)
+
+                    # Append the buffered lines to the bucket files once the buffers get too large
+                    buffered_line_count += bucket.get_buffered_line_count() - line_count
+                    if buffered_line_count > MAX_BUFFERED_LINE_COUNT:
+                        for buffered_bucket in buckets.values():
+                            buffered_bucket.flush()
+                        buffered_line_count = 0
+
+        # Assemble each bucket into an OBJ file with its own material library
+        output_file_paths = []
+        for (cell_x, cell_y), bucket in sorted(buckets.items()):
+            bucket.flush()
+
+            bucket_name = '_'.join([name, *(str(quadrant) for quadrant in get_quadrant_path(cell_x, cell_y, depth))])
+            output_file_path = os.path.join(folder_path, f'{bucket_name}.obj')
+
+            with open(output_file_path, 'w') as output_file:
+                if bucket.material_names:
+                    write_materials(os.path.join(folder_path, f'{bucket_name}.mtl'), materials, bucket.material_names, source_folder_path)
+                    output_file.write(f'mtllib {bucket_name}.mtl\n')
+
+                for element_type in ['v', 'vt', 'vn', 'f']:
+                    # Files of element types that are never used by the bucket aren't created
+                    if os.path.exists(bucket.file_paths[element_type]):
+                        with open(bucket.file_paths[element_type]) as element_file:
+                            shutil.copyfileobj(element_file, output_file)
+
+            output_file_paths.append(output_file_path)
+
+    return output_file_paths
@@ -1,24 +1,118 @@
 import math
+from typing import Optional
 
 import bmesh
 import bpy
+import numpy as np
 from bmesh.types import BMFace
-from bpy.types import DecimateModifier, Object, ShaderNodeTexImage
+from bpy.types import DecimateModifier, Image, Object, ShaderNodeTexImage
 from mathutils import Vector
 
 from src import utils
 
-
-def clean():
+# Property name, component count and array type of the values of each generic attribute type that is carried over by clean
+ATTRIBUTE_VALUE_LAYOUTS = {
+    'FLOAT': ('value', 1, np.float32),
+    'INT': ('value', 1, np.int32),
+    'INT8': ('value', 1, np.int32),
+    'BOOLEAN': ('value', 1, bool),
+    'FLOAT2': ('vector', 2, np.float32),
+    'INT32_2D': ('value', 2, np.int32),
+    'FLOAT_VECTOR': ('vector', 3, np.float32),
+    'FLOAT_COLOR': ('color', 4, np.float32),
+    'BYTE_COLOR': ('color', 4, np.float32),
+    'QUATERNION': ('value', 4, np.float32),
+}
+
+
+def clean(object: Object, merge_distance: float = 0.0001) -> utils.geometry.CleanedMesh:
     """
-    Clean up the selected mesh.
+    Clean up the mesh of the object by welding duplicate vertices and removing degenerate and duplicate faces.
+    The mesh is read into arrays, cleaned and written back at once, without switching to edit mode.
+    UV layers, custom normals, UV seams and the generic attributes (e.g. material indices, smooth shading, vertex colors and sharp edges) are carried over,
+    welded vertices keep the values of their first vertex. String attributes and shape keys are lost.
     """
 
-    bpy.ops.object.mode_set(mode='EDIT')
-    bpy.ops.mesh.select_all(action='SELECT')
-    bpy.ops.mesh.dissolve_degenerate()  # Remove redundant geometry
-    bpy.ops.mesh.remove_doubles()  # Merge duplicate vertices
-    bpy.ops.object.mode_set(mode='OBJECT')
+    mesh = object.data
+
+    # Read the geometry and the attributes that need to be carried over into arrays
+    positions = np.empty(len(mesh.vertices) * 3, dtype=np.float32)
+    mesh.vertices.foreach_get('co', positions)
+    loop_totals = np.empty(len(mesh.polygons), dtype=np.int32)
+    mesh.polygons.foreach_get('loop_total', loop_totals)
+    loop_vertex_indices = np.empty(len(mesh.loops), dtype=np.int32)
+    mesh.loops.foreach_get('vertex_index', loop_vertex_indices)
+    edge_vertex_indices = np.empty(len(mesh.edges) * 2, dtype=np.int32)
+    mesh.edges.foreach_get('vertices', edge_vertex_indices)
+    use_seam = np.empty(len(mesh.edges), dtype=bool)
+    mesh.edges.foreach_get('use_seam', use_seam)
+
+    uv_layers: dict[str, np.ndarray] = {}
+    for uv_layer in mesh.uv_layers:
+        uvs = np.empty(len(mesh.loops) * 2, dtype=np.float32)
+        uv_layer.data.foreach_get('uv', uvs)
+        uv_layers[uv_layer.name] = uvs.reshape(-1, 2)
+    active_uv_layer_name = mesh.uv_layers.active.name if mesh.uv_layers.active else None
+
+    # UV layers are stored as attributes too, but are restored separately to keep the active layer
+    attributes: list[tuple[str, str, str, np.ndarray]] = []
+    for attribute in mesh.attributes:
+        if attribute.is_internal or attribute.name == 'position' or attribute.name in uv_layers or attribute.data_type not in ATTRIBUTE_VALUE_LAYOUTS:
+            continue
+        (property_name, component_count, dtype) = ATTRIBUTE_VALUE_LAYOUTS[attribute.data_type]
+        values = np.empty(len(attribute.data) * component_count, dtype=dtype)
+        attribute.data.foreach_get(property_name, values)
+        attributes.append((attribute.name, attribute.data_type, attribute.domain, values.reshape(len(attribute.data), component_count)))
+    (active_color_name, default_color_name) = (mesh.attributes.active_color_name, mesh.attributes.default_color_name)
+
+    custom_normals = None
+    if mesh.has_custom_normals:
+        custom_normals = np.empty(len(mesh.loops) * 3, dtype=np.float32)
+        mesh.corner_normals.foreach_get('vector', custom_normals)
+
+    cleaned_mesh = utils.geometry.clean_mesh(positions.reshape(-1, 3).astype(np.float64), loop_totals, loop_vertex_indices, merge_distance)
+
+    # Rebuild the mesh from the cleaned arrays
+    mesh.clear_geometry()
+    mesh.vertices.add(len(cleaned_mesh.positions))
+    mesh.loops.add(len(cleaned_mesh.loop_vertex_indices))
+    mesh.polygons.add(len(cleaned_mesh.loop_totals))
+    mesh.vertices.foreach_set('co', cleaned_mesh.positions.astype(np.float32).ravel())
+    mesh.loops.foreach_set('vertex_index', cleaned_mesh.loop_vertex_indices.astype(np.int32))
+    mesh.polygons.foreach_set('loop_start', cleaned_mesh.get_loop_starts().astype(np.int32))
+    mesh.update(calc_edges=True)
+
+    # Edges are recalculated from the faces, so they are matched to the source edges by their vertices
+    new_edge_vertex_indices = np.empty(len(mesh.edges) * 2, dtype=np.int32)
+    mesh.edges.foreach_get('vertices', new_edge_vertex_indices)
+    edge_indices = utils.geometry.get_edge_source_indices(edge_vertex_indices.reshape(-1, 2), cleaned_mesh.vertex_map, new_edge_vertex_indices.reshape(-1, 2))
+    mesh.edges.foreach_set('use_seam', np.where(edge_indices >= 0, use_seam[edge_indices], False))
+
+    source_indices_by_domain = {'POINT': cleaned_mesh.vertex_indices, 'EDGE': edge_indices, 'FACE': cleaned_mesh.polygon_indices, 'CORNER': cleaned_mesh.loop_indices}
+    for attribute_name, data_type, domain, values in attributes:
+        source_indices = source_indices_by_domain[domain]
+        # Elements without a source element, i.e. unmatched edges, get the default value
+        new_values = np.zeros((len(source_indices), values.shape[1]), dtype=values.dtype)
+        new_values[source_indices >= 0] = values[source_indices[source_indices >= 0]]
+        attribute = mesh.attributes.get(attribute_name) or mesh.attributes.new(attribute_name, data_type, domain)
+        attribute.data.foreach_set(ATTRIBUTE_VALUE_LAYOUTS[data_type][0], new_values.ravel())
+    if active_color_name:
+        mesh.attributes.active_color_name = active_color_name
+    if default_color_name:
+        mesh.attributes.default_color_name = default_color_name
+
+    for uv_layer_name, uvs in uv_layers.items():
+        uv_layer = mesh.uv_layers.new(name=uv_layer_name)
+        uv_layer.data.foreach_set('uv', uvs[cleaned_mesh.loop_indices].ravel())
+    if active_uv_layer_name:
+        mesh.uv_layers.active = mesh.uv_layers[active_uv_layer_name]
+        mesh.uv_layers.active.active_render = True
+
+    if custom_normals is not None:
+        mesh.normals_split_custom_set(custom_normals.reshape(-1, 3)[cleaned_mesh.loop_indices])
+    mesh.update()
+
+    return cleaned_mesh
 
 
 def duplicate(object: Object, new_object_name: str) -> Object:
@@ -80,28 +174,12 @@ def separate_by_materials(object: Object) -> list[Object]:
     return seperated_objects
 
 
-def merge_images(object: Object, resolution: int, new_uv_layer_name: str):
+def assign_image_material(object: Object, image: Image, uv_layer_name: str):
     """
-    Creates a new UV layer and image for the object, bakes combined textures, and links them.
+    Replaces all materials of the object with a single new material using the given image, mapped with the given UV layer.
     """
 
-    uv_layer = object.data.uv_layers.new(name=new_uv_layer_name)
-    object.data.uv_layers.active = uv_layer
-
-    utils.uv.pack_islands(scale=True, margin=0, calculate_average_islands_scale=True)
-
-    # Create a new transparent image for baking
-    image = bpy.data.images.new(name=object.name, width=resolution, height=resolution, alpha=True)
-    image.generated_color = (0, 0, 0, 0)
-
-    # Link the new image to each material of the object
-    for material in object.data.materials:
-        nodes = material.node_tree.nodes
-        utils.material.add_empty_image(material, name=object.name, width=None, height=None, image=image)
-
-    bpy.ops.object.bake(type='DIFFUSE')  # Bake old images into the new image
-
-    # Create a new material and assign the baked image to it
+    # Create a new material and assign the image to it
     material = bpy.data.materials.new(name='material_01')
     material.use_nodes = True
     nodes = material.node_tree.nodes
@@ -109,25 +187,28 @@ def merge_images(object: Object, resolution: int, new_uv_layer_name: str):
     node_image.name = object.name
     node_image.image = image
 
-    # Add baked image to material
+    # Add image to material
     node_principled_bsdf = nodes.get('Principled BSDF')
     material.node_tree.links.new(node_image.outputs['Color'], node_principled_bsdf.inputs['Base Color'])
 
     # Assign the new material to the object and set UV layer for rendering
     object.data.materials.clear()
     object.data.materials.append(material)
+    object.data.uv_layers.active = object.data.uv_layers[uv_layer_name]
     object.data.uv_layers.active.active_render = True
 
 
 def combine_materials(object: Object):
     """
-    Combines materials of the object by separating, re-baking, and merging all materials into one.
+    Combines materials of the object by separating, cropping and packing all material textures into one texture atlas.
     """
 
     object_name = object.name
+    center = get_center(object)
     seperated_objects = utils.object.separate_by_materials(object)
 
     # Process each separated object, ensure it has a single material and remove unused pixels
+    tiled_images: list[utils.tiled_image.TiledImage] = []
     for seperated_object in seperated_objects:
         bpy.context.view_layer.objects.active = seperated_object
         bpy.ops.object.select_all(action='DESELECT')
@@ -141,9 +222,27 @@ def combine_materials(object: Object):
         if len(image_nodes) != 1:
             raise Exception('Material should only have one image assigned')
         image_node = image_nodes[0]
+        original_image = image_node.image
 
         utils.image.remove_unused_pixels(image_node, material, seperated_object, new_uv_layer_name='uv_layer_01')
 
+        # Move the cropped texture to a memory-mapped file and free the images, so only one texture is held in memory at a time
+        cropped_image = utils.object.get_image_nodes(seperated_object)[0].image
+        tiled_images.append(utils.tiled_image.TiledImage.from_image(cropped_image))
+        bpy.data.images.remove(cropped_image)
+        if original_image.users == 0:
+            bpy.data.images.remove(original_image)
+
+    # Pack the cropped textures into one atlas and map the UVs of each separated object into its area
+    atlas, offsets = utils.tiled_image.build_atlas(tiled_images)
+    for seperated_object, tiled_image, (offset_x, offset_y) in zip(seperated_objects, tiled_images, offsets):
+        utils.uv.transform(
+            seperated_object.data.uv_layers['uv_layer_01'],
+            scale=(tiled_image.width / atlas.width, tiled_image.height / atlas.height),
+            offset=(offset_x / atlas.width, offset_y / atlas.height),
+        )
+        tiled_image.remove()
+
     # Join separated objects into a single combined object
     for seperated_object in seperated_objects:
         seperated_object.select_set(True)
@@ -151,12 +250,12 @@ def combine_materials(object: Object):
     bpy.ops.object.join()
     combined_object = bpy.context.view_layer.objects.active
     combined_object.name = object_name
+    combined_object['center'] = center
 
-    # Calculate resolution for the merged image and combine textures
-    image_nodes = utils.object.get_image_nodes(combined_object)
-    total_pixel_count = sum(image_node.image.size[0] * image_node.image.size[1] for image_node in image_nodes)
-    image_resolution = int(math.sqrt(total_pixel_count))
-    merge_images(combined_object, image_resolution, new_uv_layer_name='uv_layer_02')
+    # Materialize the atlas as the only texture of the combined object
+    image = atlas.to_image(object_name, pack=True)
+    atlas.remove()
+    assign_image_material(combined_object, image, uv_layer_name='uv_layer_01')
 
 
 def subdivide(object: Object):
@@ -215,6 +314,72 @@ def subdivide(object: Object):
     bpy.data.objects.remove(object_duplicated, do_unlink=True)
 
 
+def is_inner_region_element(faces: list[BMFace], region_indices: np.ndarray, polygon_mask: np.ndarray) -> bool:
+    """
+    Checks whether an edge or vertex lies inside a single kept region, given its linked faces.
+    """
+
+    return len(faces) >= 2 and all(polygon_mask[face.index] and region_indices[face.index] == region_indices[faces[0].index] for face in faces)
+
+
+def separate_planar_regions(object: Object, min_area: float, new_object_name: str, angle_limit: float = math.radians(5)) -> Optional[Object]:
+    """
+    Moves the planar regions of the object with at least the given area into a new object, dissolving each region into as few faces as the angle limit allows.
+    The new object isn't linked to the scene, so it isn't picked up as a child when the remaining object is subdivided. Returns None if no region is large enough.
+    """
+
+    mesh = object.data
+    polygon_count = len(mesh.polygons)
+    if polygon_count == 0 or mesh.uv_layers.active is None:
+        return None
+
+    # Read the mesh arrays needed to grow the planar regions
+    polygon_normals = np.empty(polygon_count * 3, dtype=np.float32)
+    mesh.polygons.foreach_get('normal', polygon_normals)
+    polygon_areas = np.empty(polygon_count, dtype=np.float32)
+    mesh.polygons.foreach_get('area', polygon_areas)
+    loop_totals = np.empty(polygon_count, dtype=np.int32)
+    mesh.polygons.foreach_get('loop_total', loop_totals)
+    loop_vertex_indices = np.empty(len(mesh.loops), dtype=np.int32)
+    mesh.loops.foreach_get('vertex_index', loop_vertex_indices)
+    loop_edge_indices = np.empty(len(mesh.loops), dtype=np.int32)
+    mesh.loops.foreach_get('edge_index', loop_edge_indices)
+    loop_uvs = np.empty(len(mesh.loops) * 2, dtype=np.float32)
+    mesh.uv_layers.active.data.foreach_get('uv', loop_uvs)
+
+    region_indices = utils.geometry.get_planar_regions(polygon_normals.reshape(-1, 3), loop_totals, loop_vertex_indices, loop_edge_indices, loop_uvs.reshape(-1, 2), angle_limit)
+    region_areas = np.bincount(region_indices, weights=polygon_areas, minlength=polygon_count)
+    polygon_mask = region_areas[region_indices] >= min_area
+    if not polygon_mask.any():
+        return None
+
+    new_object = object.copy()
+    new_object.data = mesh.copy()
+    new_object.name = new_object_name
+
+    # Keep only the large regions in the new object and dissolve the inner edges of each region
+    bm = bmesh.new()
+    bm.from_mesh(new_object.data)
+    bm.faces.ensure_lookup_table()
+    inner_edges = [edge for edge in bm.edges if is_inner_region_element(edge.link_faces, region_indices, polygon_mask)]
+    inner_verts = [vert for vert in bm.verts if not vert.is_boundary and is_inner_region_element(vert.link_faces, region_indices, polygon_mask)]
+    bmesh.ops.delete(bm, geom=[face for face in bm.faces if not polygon_mask[face.index]], context='FACES')
+    # Unlike dissolving each region into a single face, the limited dissolve also handles regions with holes and checks the angles again after each merge
+    bmesh.ops.dissolve_limit(bm, angle_limit=angle_limit, use_dissolve_boundaries=False, verts=inner_verts, edges=inner_edges, delimit={'UV'})
+    bm.to_mesh(new_object.data)
+    bm.free()
+
+    # Remove the large regions from the object
+    bm = bmesh.new()
+    bm.from_mesh(mesh)
+    bm.faces.ensure_lookup_table()
+    bmesh.ops.delete(bm, geom=[face for face in bm.faces if polygon_mask[face.index]], context='FACES')
+    bm.to_mesh(mesh)
+    bm.free()
+
+    return new_object
+
+
 def reduce_vertices(object: Object, decimate_ratio: float):
     """
     Reduces the vertex count of an object.
@@ -249,6 +414,17 @@ def change_vertices_center(object: Object, new_center: Vector):
     # Remove artifacts in texture
     bpy.ops.mesh.customdata_custom_splitnormals_clear()
 
+    # Record the center, so tilesets created from the object can be placed relative to each other
+    object['center'] = [value + offset for value, offset in zip(new_center, get_center(object))]
+
+
+def get_center(object: Object) -> list[float]:
+    """
+    Returns the center that was subtracted from the object's vertices by change_vertices_center, which is the origin if it wasn't moved.
+    """
+
+    return [float(value) for value in object.get('center', [0, 0, 0])]
+
 
 def get_minimum_and_maximum_bounds(object: Object) -> tuple[float, float]:
     # Get the object's bounding box in world coordinates
@@ -291,3 +467,102 @@ def remove_inactive_uv_layers(object: Object):
         # If it's not the active UV layer, remove it
         if not uv_layer.active:
             mesh.uv_layers.remove(uv_layer)
+
+
+def apply_modifiers(object: Object):
+    """
+    Applies all modifiers of the active object to its mesh.
+    """
+
+    for modifier in list(object.modifiers):
+        bpy.ops.object.modifier_apply(modifier=modifier.name)
+
+
+def remove_unused_attributes(object: Object, keep_normals: bool = True):
+    """
+    Removes all mesh data that is not needed for rendering, keeping positions, the active UV map, material indices and flat shaded faces (sharp_face).
+    If normals are kept, sharp edges and custom normals are kept too, as they change the exported normals.
+    """
+
+    mesh = object.data
+    kept_attribute_names = {mesh.uv_layers.active.name, 'material_index', 'sharp_face'}
+    if keep_normals:
+        kept_attribute_names |= {'sharp_edge', 'custom_normal'}
+
+    for attribute in reversed(list(mesh.attributes)):
+        if not attribute.is_internal and not attribute.is_required and attribute.name not in kept_attribute_names:
+            mesh.attributes.remove(attribute)
+
+    object.vertex_groups.clear()
+    if mesh.shape_keys:
+        object.shape_key_clear()
+
+
+def get_morton_codes(points: np.ndarray, bits: int = 10) -> np.ndarray:
+    """
+    Calculates the Morton code of each point, so sorting by it places points that are close in space close together.
+    """
+
+    # Quantize the points to integer grid coordinates within their bounds
+    min_bound = points.min(axis=0)
+    extent = np.maximum(points.max(axis=0) - min_bound, 1e-9)
+    grid = ((points - min_bound) / extent * (2**bits - 1)).astype(np.uint64)
+
+    # Interleave the bits of the x, y and z grid coordinates
+    codes = np.zeros(len(points), dtype=np.uint64)
+    for bit in range(bits):
+        for axis in range(3):
+            codes |= ((grid[:, axis] >> np.uint64(bit)) & np.uint64(1)) << np.uint64(bit * 3 + axis)
+
+    return codes
+
+
+def merge_vertices(object: Object, merge_distance: float = 1e-5):
+    """
+    Merges vertices closer than the merge distance, e.g. the duplicates left at the quadrant borders after subdividing.
+    """
+
+    bm = bmesh.new()
+    bm.from_mesh(object.data)
+    bmesh.ops.remove_doubles(bm, verts=bm.verts, dist=merge_distance)
+    bm.to_mesh(object.data)
+    bm.free()
+
+
+def sort_spatially(object: Object):
+    """
+    Sorts the faces along a Morton curve through their centers and the vertices by their first use in that face order.
+    This is a spatial sort rather than a vertex cache optimizer like Forsyth or Tipsify: neighbouring faces end up close together in the index buffer
+    and vertex data is read mostly sequentially, but the order within small neighbourhoods isn't tuned to a cache size.
+    """
+
+    mesh = object.data
+    if len(mesh.polygons) == 0:
+        return
+
+    polygon_count = len(mesh.polygons)
+    polygon_centers = np.empty(polygon_count * 3, dtype=np.float32)
+    mesh.polygons.foreach_get('center', polygon_centers)
+    loop_totals = np.empty(polygon_count, dtype=np.int32)
+    mesh.polygons.foreach_get('loop_total', loop_totals)
+    loop_vertex_indices = np.empty(len(mesh.loops), dtype=np.int32)
+    mesh.loops.foreach_get('vertex_index', loop_vertex_indices)
+
+    # Sort faces along a space-filling curve, so consecutive faces are close in space and often share vertices
+    face_ranks = np.empty(polygon_count, dtype=np.int64)
+    face_ranks[np.argsort(get_morton_codes(polygon_centers.reshape(-1, 3)), kind='stable')] = np.arange(polygon_count)
+
+    # Sort vertices by their first use in the new face order, so vertex data is read mostly sequentially
+    loop_order = np.argsort(np.repeat(face_ranks, loop_totals), kind='stable')
+    used_vertex_indices, first_uses = np.unique(loop_vertex_indices[loop_order], return_index=True)
+    vertex_ranks = np.full(len(mesh.vertices), len(mesh.vertices), dtype=np.int64)
+    vertex_ranks[used_vertex_indices] = first_uses
+
+    bm = bmesh.new()
+    bm.from_mesh(mesh)
+    bm.faces.ensure_lookup_table()
+    bm.verts.ensure_lookup_table()
+    bm.faces.sort(key=lambda face: face_ranks[face.index])
+    bm.verts.sort(key=lambda vertex: vertex_ranks[vertex.index])
+    bm.to_mesh(mesh)
+    bm.free()
@@ -1,8 +1,7 @@
-import math
-
 from bpy.types import Object
 
 from src import utils
+from src.utils.geometry import GeometryStats
 
 
 def calculate_transformation_matrix(object: Object) -> list[float]:
@@ -13,14 +12,19 @@ def calculate_transformation_matrix(object: Object) -> list[float]:
     return [center_x, center_y, center_z, length_x / 2, 0, 0, 0, length_y / 2, 0, 0, 0, length_z / 2]
 
 
-def calculate_geometric_error(object: Object, scale_factor: float = 0.005) -> float:
-    (length_x, length_y, length_z) = utils.object.get_axis_lengths(object)
-
-    # Calculate the full diagonal of the bounding box
-    diagonal = math.sqrt(length_x**2 + length_y**2 + length_z**2)
-
-    # Adjust the geometric error calculation
+def calculate_geometric_error(geometry_stats: GeometryStats, scale_factor: float = 0.005) -> float:
+    # Adjust the geometric error calculation based on the full diagonal of the bounding box
     # You may need to tweak the scale_factor to control the aggressiveness of LOD transitions
-    geometric_error = diagonal * scale_factor
+    geometric_error = geometry_stats.diagonal * scale_factor
 
     return geometric_error
+
+
+def calculate_coarse_region_area(geometry_stats: GeometryStats, area_ratio: float = 1 / 16) -> float:
+    """
+    Calculates the minimum area of planar regions that are kept in a tile refined with ADD, instead of being passed down to its children.
+    """
+
+    (length_x, length_y, _) = geometry_stats.axis_lengths
+
+    return float(length_x * length_y * area_ratio)
@@ -0,0 +1,178 @@
+import math
+import os
+import tempfile
+from contextlib import contextmanager
+from typing import Iterator, Optional
+
+import bpy
+import numpy as np
+from bpy.types import Image
+
+# Number of pixel rows processed at once, which bounds the memory used per operation
+BLOCK_HEIGHT = 256
+
+
+@contextmanager
+def float_buffer(length: int) -> Iterator[np.memmap]:
+    """
+    Provides a temporary memory-mapped float buffer, used to exchange pixels with Blender without holding them in memory.
+    """
+
+    file_descriptor, file_path = tempfile.mkstemp(suffix='.float')
+    os.close(file_descriptor)
+    buffer = np.memmap(file_path, dtype=np.float32, mode='w+', shape=(length,))
+
+    try:
+        yield buffer
+    finally:
+        del buffer
+        os.remove(file_path)
+
+
+class TiledImage:
+    """
+    An 8-bit RGBA image backed by a memory-mapped file, which is processed in blocks of rows so it never has to be fully held in memory.
+    """
+
+    def __init__(self, width: int, height: int, file_path: Optional[str] = None):
+        if file_path is None:
+            file_descriptor, file_path = tempfile.mkstemp(suffix='.rgba')
+            os.close(file_descriptor)
+
+        self.width = width
+        self.height = height
+        self.file_path = file_path
+        # Rows are stored bottom to top, matching the pixel order of Blender images
+        self.pixels = np.memmap(file_path, dtype=np.uint8, mode='w+', shape=(height, width, 4))
+
+    @classmethod
+    def from_image(cls, image: Image) -> 'TiledImage':
+        """
+        Copies the pixels of a Blender image into a new tiled image.
+        """
+
+        (width, height) = image.size
+        tiled_image = cls(width, height)
+
+        with float_buffer(width * height * 4) as buffer:
+            image.pixels.foreach_get(buffer)
+
+            for row_start, row_end in tiled_image.get_blocks():
+                block = buffer[row_start * width * 4 : row_end * width * 4].reshape(-1, width, 4)
+                tiled_image.pixels[row_start:row_end] = np.clip(block * 255 + 0.5, 0, 255).astype(np.uint8)
+
+        return tiled_image
+
+    def to_image(self, name: str, pack: bool = False) -> Image:
+        """
+        Materializes the tiled image as a Blender image.
+        Packing encodes the image as PNG into the .blend file, which is only needed for images that have to survive saving it, not for temporary bake sources.
+        """
+
+        image = bpy.data.images.new(name, self.width, self.height, alpha=True)
+
+        with float_buffer(self.width * self.height * 4) as buffer:
+            for row_start, row_end in self.get_blocks():
+                buffer[row_start * self.width * 4 : row_end * self.width * 4] = (self.pixels[row_start:row_end] / 255).ravel()
+
+            image.pixels.foreach_set(buffer)
+
+        if pack:
+            image.pack()
+
+        return image
+
+    def get_blocks(self) -> Iterator[tuple[int, int]]:
+        """
+        Yields the start and end rows of each block.
+        """
+
+        for row_start in range(0, self.height, BLOCK_HEIGHT):
+            yield (row_start, min(row_start + BLOCK_HEIGHT, self.height))
+
+    def crop(self, x: int, y: int, width: int, height: int) -> 'TiledImage':
+        """
+        Creates a new tiled image from a rectangular area of this image.
+        """
+
+        cropped_image = TiledImage(width, height)
+
+        for row_start, row_end in cropped_image.get_blocks():
+            cropped_image.pixels[row_start:row_end] = self.pixels[y + row_start : y + row_end, x : x + width]
+
+        return cropped_image
+
+    def paste(self, source: 'TiledImage', x: int, y: int):
+        """
+        Copies another tiled image into this image at the given pixel offset.
+        """
+
+        for row_start, row_end in source.get_blocks():
+            self.pixels[y + row_start : y + row_end, x : x + source.width] = source.pixels[row_start:row_end]
+
+    def downsample(self, width: int, height: int) -> 'TiledImage':
+        """
+        Creates a new tiled image with the given size, averaging all source pixels covered by each target pixel.
+        """
+
+        downsampled_image = TiledImage(width, height)
+
+        # First source row and column covered by each target row and column
+        row_starts = np.arange(height) * self.height // height
+        column_starts = np.arange(width) * self.width // width
+        column_counts = np.maximum(np.diff(np.append(column_starts, self.width)), 1)
+
+        for row_start, row_end in downsampled_image.get_blocks():
+            source_row_start = row_starts[row_start]
+            # When upscaling, several target rows share a source row, which must still be part of the block
+            source_row_end = max(row_starts[row_end] if row_end < height else self.height, row_starts[row_end - 1] + 1)
+            block = self.pixels[source_row_start:source_row_end].astype(np.float32)
+
+            block_row_starts = row_starts[row_start:row_end] - source_row_start
+            row_counts = np.maximum(np.diff(np.append(block_row_starts, source_row_end - source_row_start)), 1)
+
+            # Sum the covered source pixels and divide by their count
+            block = np.add.reduceat(block, block_row_starts, axis=0)
+            block = np.add.reduceat(block, column_starts, axis=1)
+            block /= row_counts[:, np.newaxis, np.newaxis] * column_counts[np.newaxis, :, np.newaxis]
+
+            downsampled_image.pixels[row_start:row_end] = np.clip(block + 0.5, 0, 255).astype(np.uint8)
+
+        return downsampled_image
+
+    def remove(self):
+        """
+        Deletes the memory-mapped file of the image.
+        """
+
+        del self.pixels
+        os.remove(self.file_path)
+
+
+def build_atlas(tiled_images: list[TiledImage]) -> tuple[TiledImage, list[tuple[int, int]]]:
+    """
+    Packs tiled images into a single atlas using shelf packing and returns the atlas with the pixel offset of each image.
+    """
+
+    total_pixel_count = sum(tiled_image.width * tiled_image.height for tiled_image in tiled_images)
+    atlas_width = max(int(math.sqrt(total_pixel_count)), *(tiled_image.width for tiled_image in tiled_images))
+
+    # Place the images row by row, starting with the tallest ones to reduce unused space
+    offsets: list[tuple[int, int]] = [(0, 0)] * len(tiled_images)
+    shelf_x = shelf_y = shelf_height = 0
+    for index in sorted(range(len(tiled_images)), key=lambda index: tiled_images[index].height, reverse=True):
+        tiled_image = tiled_images[index]
+        if shelf_x + tiled_image.width > atlas_width:
+            shelf_x = 0
+            shelf_y += shelf_height
+            shelf_height = 0
+
+        offsets[index] = (shelf_x, shelf_y)
+        shelf_x += tiled_image.width
+        shelf_height = max(shelf_height, tiled_image.height)
+
+    atlas = TiledImage(atlas_width, shelf_y + shelf_height)
+    for tiled_image, (offset_x, offset_y) in zip(tiled_images, offsets):
+        atlas.paste(tiled_image, offset_x, offset_y)
+
+    return (atlas, offsets)
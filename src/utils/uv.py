@@ -1,4 +1,6 @@
 import bpy
+import numpy as np
+from bpy.types import MeshUVLoopLayer
 
 
 def pack_islands(
@@ -16,3 +18,14 @@ def pack_islands(
         bpy.ops.uv.average_islands_scale()
     bpy.ops.uv.pack_islands(scale=scale, margin=margin)
     bpy.ops.object.mode_set(mode='OBJECT')
+
+
+def transform(uv_layer: MeshUVLoopLayer, scale: tuple[float, float], offset: tuple[float, float]):
+    """
+    Scales and offsets all UV coordinates of the layer, e.g. to map them into an area of a texture atlas.
+    """
+
+    uvs = np.empty(len(uv_layer.data) * 2, dtype=np.float32)
+    uv_layer.data.foreach_get('uv', uvs)
+    uvs = uvs.reshape(-1, 2) * np.array(scale, dtype=np.float32) + np.array(offset, dtype=np.float32)
+    uv_layer.data.foreach_set('uv', uvs.ravel())
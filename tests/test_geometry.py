@@ -0,0 +1,121 @@
+import numpy as np
+
+from src.utils.geometry import clean_mesh, get_close_vertex_pairs, get_connected_components, get_edge_source_indices, get_planar_regions
+
+
+def test_weld_merges_vertices_across_cell_borders():
+    # Both vertices are 2e-9 apart, but on different sides of a grid cell border
+    positions = np.array([[0, 0, 0], [1, 0, 0], [0, 1, 0], [1e-4 - 1e-9, 0, 0], [1e-4 + 1e-9, 0, 0]], dtype=np.float64)
+    cleaned_mesh = clean_mesh(positions, np.array([3, 3]), np.array([3, 1, 2, 4, 1, 2]), merge_distance=1e-4)
+
+    assert len(cleaned_mesh.positions) == 3
+    assert cleaned_mesh.removed_duplicate_face_count == 1
+
+
+def test_weld_keeps_vertices_further_apart_than_merge_distance():
+    # Both vertices fall into neighbouring cells, but are further apart than the merge distance
+    positions = np.array([[0, 0, 0], [1.9, 0, 0], [0, 5, 0], [5, 5, 0]], dtype=np.float64)
+    cleaned_mesh = clean_mesh(positions, np.array([3, 3]), np.array([0, 2, 3, 1, 3, 2]), merge_distance=1)
+
+    assert len(cleaned_mesh.positions) == 4
+    assert cleaned_mesh.removed_vertex_count == 0
+
+
+def test_weld_is_transitive():
+    positions = np.array([[0, 0, 0], [0.8, 0, 0], [1.6, 0, 0], [0, 5, 0], [5, 5, 0]], dtype=np.float64)
+    cleaned_mesh = clean_mesh(positions, np.array([3, 3]), np.array([0, 3, 4, 2, 4, 3]), merge_distance=1)
+
+    # The first and last vertex are merged through the middle one, so both faces become duplicates
+    assert len(cleaned_mesh.positions) == 3
+    assert np.array_equal(cleaned_mesh.vertex_indices, [0, 3, 4])
+    assert np.array_equal(cleaned_mesh.vertex_map, [0, 0, 0, 1, 2])
+    assert cleaned_mesh.removed_duplicate_face_count == 1
+
+
+def test_close_vertex_pairs_match_brute_force():
+    positions = np.random.default_rng(0).random((500, 3))
+    pairs = get_close_vertex_pairs(positions, distance=0.05)
+
+    distances = np.linalg.norm(positions[:, np.newaxis] - positions[np.newaxis], axis=2)
+    expected_pairs = np.argwhere(np.triu(distances <= 0.05, k=1))
+
+    assert set(map(tuple, np.sort(pairs, axis=1).tolist())) == set(map(tuple, expected_pairs.tolist()))
+
+
+def test_degenerate_faces_are_removed():
+    positions = np.array([[0, 0, 0], [1, 0, 0], [0, 1, 0], [1, 1, 0], [2, 0, 0]], dtype=np.float64)
+    # The second face is a line, the third has a repeated vertex and collapses into a triangle
+    cleaned_mesh = clean_mesh(positions, np.array([3, 3, 4]), np.array([0, 1, 2, 0, 1, 4, 1, 3, 3, 2]), merge_distance=1e-4)
+
+    assert np.array_equal(cleaned_mesh.loop_totals, [3, 3])
+    assert np.array_equal(cleaned_mesh.polygon_indices, [0, 2])
+    assert np.array_equal(cleaned_mesh.loop_indices, [0, 1, 2, 6, 8, 9])
+    assert cleaned_mesh.removed_degenerate_face_count == 1
+    assert cleaned_mesh.removed_vertex_count == 1
+
+
+def test_small_faces_at_large_coordinates_are_kept():
+    # A triangle of 5 cm at UTM coordinates, whose area is lost when the cross products are taken from the origin
+    offset = np.array([2_600_000, 1_200_000, 500], dtype=np.float64)
+    positions = np.array([[0, 0, 0], [0.05, 0, 0], [0, 0.05, 0]]) + offset
+    cleaned_mesh = clean_mesh(positions, np.array([3]), np.array([0, 1, 2]), merge_distance=1e-4)
+
+    assert len(cleaned_mesh.loop_totals) == 1
+
+
+def test_duplicate_faces_are_removed_regardless_of_winding():
+    positions = np.array([[0, 0, 0], [1, 0, 0], [0, 1, 0]], dtype=np.float64)
+    cleaned_mesh = clean_mesh(positions, np.array([3, 3]), np.array([0, 1, 2, 2, 1, 0]), merge_distance=1e-4)
+
+    assert np.array_equal(cleaned_mesh.polygon_indices, [0])
+    assert cleaned_mesh.removed_duplicate_face_count == 1
+
+
+def test_connected_components_are_labelled_by_their_first_element():
+    labels = get_connected_components(6, np.array([[4, 2], [2, 5], [1, 3]]))
+
+    assert np.array_equal(labels, [0, 1, 2, 1, 2, 2])
+
+
+def test_edges_are_matched_to_source_edges():
+    source_edge_vertex_indices = np.array([[0, 1], [1, 2], [2, 3], [3, 0]])
+    # Vertex 3 is welded onto vertex 2, so the edge between them collapses
+    vertex_map = np.array([0, 1, 2, 2])
+    edge_indices = get_edge_source_indices(source_edge_vertex_indices, vertex_map, np.array([[1, 0], [2, 1], [0, 2], [1, 3]]))
+
+    assert np.array_equal(edge_indices, [0, 1, 3, -1])
+
+
+def create_strip(angles: np.ndarray) -> tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Creates the arrays of a strip of quads along the x axis, where each quad is tilted around the y axis by the given angle.
+    """
+
+    profile = np.concatenate([[[0, 0]], np.cumsum(np.stack([np.cos(angles), np.sin(angles)], axis=1), axis=0)])
+    normals = np.stack([-np.sin(angles), np.zeros_like(angles), np.cos(angles)], axis=1)
+
+    # Vertex 2i is at y=0 and vertex 2i+1 at y=1 of the profile point i, edge i crosses the strip and edges i+n+1 and i+2n+1 run along its sides
+    face_count = len(angles)
+    loop_vertex_indices = np.stack([2 * np.arange(face_count), 2 * np.arange(face_count) + 2, 2 * np.arange(face_count) + 3, 2 * np.arange(face_count) + 1], axis=1)
+    loop_edge_indices = np.stack([np.arange(face_count) + face_count + 1, np.arange(face_count) + 1, np.arange(face_count) + 2 * face_count + 1, np.arange(face_count)], axis=1)
+    loop_uvs = np.stack([profile[loop_vertex_indices // 2, 0], loop_vertex_indices % 2], axis=2)
+
+    return normals, np.full(face_count, 4), loop_vertex_indices.reshape(-1), loop_edge_indices.reshape(-1), loop_uvs.reshape(-1, 2)
+
+
+def test_planar_regions_of_flat_strip():
+    region_indices = get_planar_regions(*create_strip(np.zeros(10)), angle_limit=np.radians(5))
+
+    assert np.array_equal(region_indices, np.zeros(10))
+
+
+def test_planar_regions_dont_accumulate_curvature():
+    # Each face is tilted 4 degrees more than the last, so the strip bends by 92 degrees
+    (normals, *arrays) = create_strip(np.radians(4 * np.arange(24)))
+    region_indices = get_planar_regions(normals, *arrays, angle_limit=np.radians(5))
+
+    assert len(np.unique(region_indices)) > 1
+    for region_index in np.unique(region_indices):
+        region_normals = normals[region_indices == region_index]
+        mean_normal = region_normals.mean(axis=0) / np.linalg.norm(region_normals.mean(axis=0))
+        assert np.all(region_normals @ mean_normal >= np.cos(np.radians(5)))
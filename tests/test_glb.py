@@ -0,0 +1,49 @@
+import struct
+
+from src.utils.glb import get_image_size
+
+
+def test_png_size():
+    header = b'\x89PNG\r\n\x1a\n' + struct.pack('>I', 13) + b'IHDR' + struct.pack('>II', 640, 480) + bytes([8, 6, 0, 0, 0])
+
+    assert get_image_size(header) == (640, 480)
+
+
+def test_lossy_webp_size():
+    # The frame tag and start code are followed by the 14 bit dimensions, whose upper two bits hold the scale
+    frame = b'\x00\x00\x00' + b'\x9d\x01\x2a' + struct.pack('<HH', 640 | 0x4000, 480 | 0x8000)
+    header = b'RIFF' + struct.pack('<I', 4 + 8 + len(frame)) + b'WEBP' + b'VP8 ' + struct.pack('<I', len(frame)) + frame
+
+    assert get_image_size(header) == (640, 480)
+
+
+def test_lossless_webp_size():
+    # The signature byte is followed by the 14 bit width and height minus one
+    bits = (640 - 1) | ((480 - 1) << 14)
+    frame = b'\x2f' + bits.to_bytes(4, 'little')
+    header = b'RIFF' + struct.pack('<I', 4 + 8 + len(frame)) + b'WEBP' + b'VP8L' + struct.pack('<I', len(frame)) + frame
+
+    assert get_image_size(header) == (640, 480)
+
+
+def test_extended_webp_size():
+    # The flags and reserved bytes are followed by the 24 bit width and height minus one
+    frame = b'\x10\x00\x00\x00' + (5000 - 1).to_bytes(3, 'little') + (3000 - 1).to_bytes(3, 'little')
+    header = b'RIFF' + struct.pack('<I', 4 + 8 + len(frame)) + b'WEBP' + b'VP8X' + struct.pack('<I', len(frame)) + frame
+
+    assert get_image_size(header) == (5000, 3000)
+
+
+def test_jpeg_size():
+    # The start of frame segment follows an APP0 and a Huffman table segment, which have to be skipped
+    app0 = b'\xff\xe0' + struct.pack('>H', 16) + b'JFIF\x00' + bytes(9)
+    huffman_table = b'\xff\xc4' + struct.pack('>H', 5) + bytes(3)
+    start_of_frame = b'\xff\xc0' + struct.pack('>HBHHB', 11, 8, 480, 640, 1) + bytes(3)
+
+    assert get_image_size(b'\xff\xd8' + app0 + huffman_table + start_of_frame) == (640, 480)
+
+
+def test_unknown_image_size():
+    assert get_image_size(b'GIF89a' + bytes(20)) is None
+    # A truncated JPEG header without a start of frame segment
+    assert get_image_size(b'\xff\xd8\xff\xe0' + struct.pack('>H', 16)) is None
@@ -0,0 +1,107 @@
+import os
+
+import pytest
+
+from src.utils import obj
+
+
+def create_grid_obj(folder_path: str, size: int = 4) -> str:
+    """
+    Writes an OBJ file with a grid of size x size quads, which switches its material and smoothing group halfway through the faces.
+    Faces of odd rows use negative indices.
+    """
+
+    os.makedirs(os.path.join(folder_path, 'textures'))
+    with open(os.path.join(folder_path, 'grid.mtl'), 'w') as file:
+        file.write('newmtl ground\nKd 1 1 1\nmap_Kd textures/ground.jpg\n\nnewmtl roof\nmap_Kd textures/roof.jpg\n')
+
+    lines = ['mtllib grid.mtl\n', 'usemtl ground\n', 's 1\n']
+    for y in range(size + 1):
+        for x in range(size + 1):
+            lines.append(f'v {x} {y} {x * y}\n')
+            lines.append(f'vt {x / size} {y / size}\n')
+    lines.append('vn 0 0 1\n')
+
+    for y in range(size):
+        if y == size // 2:
+            lines.extend(['usemtl roof\n', 's off\n'])
+        for x in range(size):
+            indices = [y * (size + 1) + x + 1, y * (size + 1) + x + 2, (y + 1) * (size + 1) + x + 2, (y + 1) * (size + 1) + x + 1]
+            if y % 2:
+                vertex_count = (size + 1) ** 2
+                lines.append('f ' + ' '.join(f'{index - vertex_count - 1}/{index - vertex_count - 1}/-1' for index in indices) + '\n')
+            else:
+                lines.append('f ' + ' '.join(f'{index}/{index}/1' for index in indices) + '\n')
+
+    file_path = os.path.join(folder_path, 'grid.obj')
+    with open(file_path, 'w') as file:
+        file.writelines(lines)
+
+    return file_path
+
+
+def read_faces(file_path: str) -> list[tuple[tuple[tuple[float, ...], ...], str, str]]:
+    """
+    Reads the faces of an OBJ file with resolved positions, UVs and normals, together with their material and smoothing group.
+    """
+
+    values: dict[str, list[tuple[float, ...]]] = {'v': [], 'vt': [], 'vn': []}
+    faces = []
+    (material_name, smoothing_group) = (None, None)
+
+    with open(file_path) as file:
+        for line in file:
+            (keyword, *arguments) = line.split()
+            if keyword in values:
+                values[keyword].append(tuple(float(argument) for argument in arguments))
+            elif keyword == 'usemtl':
+                material_name = arguments[0]
+            elif keyword == 's':
+                smoothing_group = arguments[0]
+            elif keyword == 'f':
+                face_values = []
+                for face_vertex in arguments:
+                    for element_type, index in zip(['v', 'vt', 'vn'], face_vertex.split('/')):
+                        index = int(index)
+                        face_values.append(values[element_type][index - 1 if index > 0 else len(values[element_type]) + index])
+                faces.append((tuple(face_values), material_name, smoothing_group))
+
+    return faces
+
+
+@pytest.mark.parametrize('depth', [1, 2])
+def test_split_keeps_all_faces(tmp_path, monkeypatch, depth):
+    # Flush after every few lines, so the faces of each bucket are appended over multiple flushes
+    monkeypatch.setattr(obj, 'MAX_BUFFERED_LINE_COUNT', 5)
+    file_path = create_grid_obj(str(tmp_path / 'input'))
+
+    file_paths = obj.split(file_path, str(tmp_path / 'output'), depth)
+
+    assert len(file_paths) == 4**depth
+    split_faces = [face for split_file_path in file_paths for face in read_faces(split_file_path)]
+    assert sorted(split_faces) == sorted(read_faces(file_path))
+
+
+def test_split_writes_used_vertices_once(tmp_path):
+    file_path = create_grid_obj(str(tmp_path / 'input'))
+    file_paths = obj.split(file_path, str(tmp_path / 'output'), depth=1)
+
+    # Each quadrant of the 4x4 grid uses 3x3 vertices and UVs and the single normal
+    for split_file_path in file_paths:
+        with open(split_file_path) as file:
+            keywords = [line.split()[0] for line in file]
+        assert (keywords.count('v'), keywords.count('vt'), keywords.count('vn'), keywords.count('f')) == (9, 9, 1, 4)
+
+
+def test_split_writes_used_materials(tmp_path):
+    file_path = create_grid_obj(str(tmp_path / 'input'))
+    file_paths = obj.split(file_path, str(tmp_path / 'output' / 'split'), depth=1)
+
+    # The lower quadrants only use the first material, the upper ones only the second
+    assert [os.path.basename(split_file_path) for split_file_path in file_paths] == ['grid_0.obj', 'grid_2.obj', 'grid_1.obj', 'grid_3.obj']
+    with open(tmp_path / 'output' / 'split' / 'grid_0.mtl') as file:
+        assert file.read() == 'newmtl ground\nKd 1 1 1\nmap_Kd ../../input/textures/ground.jpg\n\n'
+    with open(tmp_path / 'output' / 'split' / 'grid_3.mtl') as file:
+        assert file.read() == 'newmtl roof\nmap_Kd ../../input/textures/roof.jpg\n\n'
+    with open(file_paths[0]) as file:
+        assert file.readline() == 'mtllib grid_0.mtl\n'
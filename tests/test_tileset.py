@@ -0,0 +1,37 @@
+import json
+
+from src.tileset.tileset import Tileset
+
+ROOT = {
+    'boundingVolume': {'box': [0, 0, 0, 3, 0, 0, 0, 4, 0, 0, 0, 0]},
+    'geometricError': 5,
+    'refine': 'REPLACE',
+    'transform': [1, 0, 0, 0, 0, 0, -1, 0, 0, 1, 0, 0, 0, 0, 0, 1],
+}
+
+
+def test_load_fills_missing_geometric_error(tmp_path):
+    # Tilesets saved by earlier versions don't contain the top-level geometric error
+    (tmp_path / 'tileset.json').write_text(json.dumps({'asset': {'version': '1.0'}, 'root': ROOT}))
+
+    tileset = Tileset.load(str(tmp_path))
+
+    assert tileset.geometric_error == 10
+    assert json.loads(tileset.model_dump_json(exclude_none=True, by_alias=True))['geometricError'] == 10
+
+
+def test_load_keeps_saved_geometric_error(tmp_path):
+    (tmp_path / 'tileset.json').write_text(json.dumps({'asset': {'version': '1.0'}, 'geometricError': 20, 'root': ROOT}))
+
+    assert Tileset.load(str(tmp_path)).geometric_error == 20
+
+
+def test_inherited_refine_is_not_written(tmp_path):
+    child = {'boundingVolume': {'box': [0, 0, 0, 1, 0, 0, 0, 1, 0, 0, 0, 1]}, 'geometricError': 0}
+    (tmp_path / 'tileset.json').write_text(json.dumps({'asset': {'version': '1.0'}, 'root': {**ROOT, 'refine': 'ADD', 'children': [child]}}))
+
+    Tileset.load(str(tmp_path)).save_json(str(tmp_path))
+    root = json.loads((tmp_path / 'tileset.json').read_text())['root']
+
+    assert root['refine'] == 'ADD'
+    assert 'refine' not in root['children'][0]